@@ -0,0 +1,107 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import get_language
+
+from .replicas import current_replica
+
+TAG_KEY = 'page-tag:{}'
+
+
+def new_version():
+    """
+    Версия тега — время в наносекундах, а не счётчик с единицы.
+
+    Если ключ с версией вытеснится из кэша, новая версия всё равно
+    не совпадёт со старой, и устаревшие страницы не оживут.
+    """
+    return time.time_ns()
+
+
+def tag_versions(tags):
+    keys = [TAG_KEY.format(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [str(versions[key]) for key in keys]
+
+
+def versioned_key(prefix, tags, *parts):
+    """Ключ кэша, который устаревает при сбросе любого из тегов."""
+    versions = '.'.join(tag_versions(tags))
+    digest = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    return f'{prefix}:{get_language()}:{versions}:{digest}'
+
+
+def make_etag(request, tags, *parts):
+    """
+    Значение ETag страницы для условных GET-запросов.
+
+    Учитывает пользователя и язык, поскольку страница для них разная,
+    и версии тегов, которые меняются вместе с данными страницы.
+    Пользователю страница показывает формы с CSRF-токеном, поэтому
+    в ETag входит и CSRF-cookie: после нового входа токен меняется,
+    и браузер не должен остаться со старой формой, которую отклонит
+    CsrfViewMiddleware.
+    """
+    if request.user.is_authenticated:
+        user = request.user.pk
+        csrf = request.META.get('CSRF_COOKIE', '')
+    else:
+        user, csrf = 'anon', ''
+    return hashlib.md5(
+        ':'.join(map(str, (user, csrf, get_language(), *tag_versions(tags),
+                           *parts))).encode()
+    ).hexdigest()
+
+
+def invalidate_tags(*tags):
+    """Сбрасывает все закэшированные страницы с этими тегами."""
+    cache.set_many(
+        {TAG_KEY.format(tag): new_version() for tag in tags}, timeout=None
+    )
+
+
+class AnonymousPageCacheMixin:
+    """
+    Отдаёт анонимным посетителям готовые страницы из кэша.
+
+    Ключ зависит от адреса (вместе с GET-параметрами), языка и версий
+    тегов страницы. Чтобы сбросить страницы, достаточно вызвать
+    invalidate_tags() с нужным тегом, например из сигнала.
+    """
+    page_cache_tags = ()
+
+    def get_page_cache_tags(self):
+        return self.page_cache_tags
+
+    def get_page_cache_key(self):
+        return versioned_key(
+            'page', self.get_page_cache_tags(), self.request.get_full_path()
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+        key = self.get_page_cache_key()
+        response = cache.get(key)
+        if response is not None:
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = settings.PAGE_CACHE_TIMEOUT
+            if current_replica() is not None:
+                # Реплика может отставать от основной базы: такую
+                # страницу храним не дольше окна чтения своих записей.
+                timeout = min(timeout, settings.REPLICA_PIN_SECONDS)
+            if hasattr(response, 'add_post_render_callback'):
+                response.add_post_render_callback(
+                    lambda rendered: cache.set(key, rendered, timeout)
+                )
+            else:
+                cache.set(key, response, timeout)
+        return response
@@ -0,0 +1,114 @@
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from news.models import Comment, News
+
+User = get_user_model()
+
+
+def prefetch_counts():
+    """Старый способ: загружаем все комментарии и считаем их в Python."""
+    news_list = News.objects.prefetch_related(
+        'comment_set'
+    )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+    return [len(news.comment_set.all()) for news in news_list]
+
+
+def annotate_counts():
+    """Новый способ: число комментариев считает БД."""
+    news_list = News.objects.annotate(
+        comments_total=Count('comment')
+    ).order_by(*News._meta.ordering)[:settings.NEWS_COUNT_ON_HOME_PAGE]
+    return [news.comments_total for news in news_list]
+
+
+def column_counts():
+    """Счётчик, который хранится в самой новости."""
+    news_list = News.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE]
+    return [news.comment_count for news in news_list]
+
+
+STRATEGIES = (
+    ('prefetch', prefetch_counts),
+    ('annotate', annotate_counts),
+    ('column', column_counts),
+)
+
+
+class _Rollback(Exception):
+    """Откатывает транзакцию с тестовыми данными."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время и память подсчёта комментариев на главной '
+        'странице при разном объёме комментариев. '
+        'Тестовые данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--volumes', type=int, nargs='+',
+            default=[10, 100, 1000, 5000],
+            help='Число комментариев к каждой новости.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько раз повторять каждый замер.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['volumes'], options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def run(self, volumes, repeat):
+        user = User.objects.create(username='bench_home_page')
+        news_list = [
+            News.objects.create(title=f'Новость {i}', text='Текст')
+            for i in range(settings.NEWS_COUNT_ON_HOME_PAGE)
+        ]
+        created = 0
+        self.stdout.write(
+            f'{"comments/news":>14} {"strategy":>9} {"queries":>8} '
+            f'{"ms":>9} {"peak KiB":>10}'
+        )
+        for volume in sorted(volumes):
+            for news in news_list:
+                Comment.objects.bulk_create(
+                    (
+                        Comment(news=news, author=user, text='x' * 200)
+                        for _ in range(volume - created)
+                    ),
+                    batch_size=500,
+                )
+            created = volume
+            for name, strategy in STRATEGIES:
+                self.measure(volume, name, strategy, repeat)
+
+    def measure(self, volume, name, strategy, repeat):
+        with CaptureQueriesContext(connection) as queries:
+            strategy()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            strategy()
+            timings.append(time.perf_counter() - started)
+        tracemalloc.start()
+        strategy()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{volume:>14} {name:>9} {len(queries):>8} '
+            f'{min(timings) * 1000:>9.2f} {peak / 1024:>10.1f}'
+        )
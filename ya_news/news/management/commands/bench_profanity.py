@@ -0,0 +1,78 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from news.profanity import build_pattern
+
+ALPHABET = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+
+
+def random_word(rng):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(5, 12)))
+
+
+def loop_search(words, text):
+    """Прежняя проверка: отдельный поиск подстроки для каждого слова."""
+    lowered_text = text.lower()
+    for word in words:
+        if word in lowered_text:
+            return word
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость проверки комментария на запрещённые слова: '
+        'цикл по словарю против одного скомпилированного выражения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dictionary-sizes', type=int, nargs='+',
+            default=[10, 100, 1000, 10000],
+        )
+        parser.add_argument(
+            '--text-sizes', type=int, nargs='+', default=[100, 1000, 10000],
+            help='Длина комментария в символах.',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        repeat = options['repeat']
+        self.stdout.write(
+            f'{"words":>7} {"chars":>7} {"loop, µs":>10} '
+            f'{"regex, µs":>10} {"build, ms":>10} {"speedup":>8}'
+        )
+        for dictionary_size in options['dictionary_sizes']:
+            words = sorted({random_word(rng) for _ in range(dictionary_size)})
+            started = time.perf_counter()
+            pattern = build_pattern(words)
+            build_time = time.perf_counter() - started
+            for text_size in options['text_sizes']:
+                # Чистый текст: худший случай, просматривается целиком.
+                text = ' '.join(
+                    random_word(rng) for _ in range(text_size // 8 + 1)
+                )[:text_size]
+                loop_time = self.measure(
+                    lambda: loop_search(words, text), repeat
+                )
+                regex_time = self.measure(
+                    lambda: pattern.search(text.lower()), repeat
+                )
+                self.stdout.write(
+                    f'{dictionary_size:>7} {text_size:>7} '
+                    f'{loop_time * 1e6:>10.1f} {regex_time * 1e6:>10.1f} '
+                    f'{build_time * 1e3:>10.1f} '
+                    f'{loop_time / regex_time:>7.1f}x'
+                )
+
+    def measure(self, func, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+        return best
@@ -0,0 +1,86 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from news.models import News
+from news.search import search_news
+
+ALPHABET = 'абвгдежзиклмнопрстуфхцчшэюя'
+
+
+class _Rollback(Exception):
+    """Откатывает транзакцию с тестовыми данными."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержку поиска по новостям через FTS5 и icontains '
+        'на растущем объёме данных. Данные создаются в транзакции '
+        'и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000, 10000, 50000],
+            help='Число новостей в базе для каждого замера.',
+        )
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        vocabulary = [
+            ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(4, 10)))
+            for _ in range(20000)
+        ]
+        known = rng.sample(vocabulary, options['queries'])
+        # Слова, которых нет в новостях: худший случай для icontains,
+        # которому приходится просмотреть всю таблицу.
+        unknown = [term + 'щщ' for term in known]
+        created = 0
+        self.stdout.write(
+            f'{"news":>8} {"terms":>8} {"icontains, ms":>14} {"fts5, ms":>10}'
+        )
+        for size in sorted(options['sizes']):
+            News.objects.bulk_create(
+                (
+                    News(
+                        title=' '.join(rng.choices(vocabulary, k=4)),
+                        text=' '.join(rng.choices(vocabulary, k=80)),
+                    )
+                    for _ in range(size - created)
+                ),
+                batch_size=1000,
+            )
+            created = size
+            for label, terms in (('found', known), ('missing', unknown)):
+                naive = self.measure(terms, lambda term: list(
+                    News.objects.filter(
+                        Q(title__icontains=term) | Q(text__icontains=term)
+                    )[:20]
+                ))
+                fts = self.measure(terms, lambda term: search_news(term, 20))
+                self.stdout.write(
+                    f'{size:>8} {label:>8} {naive:>14.2f} {fts:>10.2f}'
+                )
+
+    def measure(self, terms, search):
+        """Медианная задержка одного поиска в миллисекундах."""
+        timings = []
+        for term in terms:
+            started = time.perf_counter()
+            search(term)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        return timings[len(timings) // 2] * 1000
@@ -0,0 +1,156 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+BACKENDS = {
+    'stock': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'CONN_MAX_AGE': 0,
+    },
+    'tuned': {
+        **settings.DATABASES['default'],
+        'ENGINE': 'news.sqlite',
+    },
+}
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    index = max(0, round(share * len(ordered) + 0.5) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def setup_schema(alias, news):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            'CREATE TABLE bench_news '
+            '(id INTEGER PRIMARY KEY, comment_count INTEGER NOT NULL)'
+        )
+        cursor.execute(
+            'CREATE TABLE bench_comment (id INTEGER PRIMARY KEY, '
+            'news_id INTEGER NOT NULL, text TEXT NOT NULL)'
+        )
+        cursor.execute(
+            'CREATE INDEX bench_comment_news ON bench_comment (news_id, id)'
+        )
+        cursor.executemany(
+            'INSERT INTO bench_news (id, comment_count) VALUES (%s, 0)',
+            [(i,) for i in range(1, news + 1)],
+        )
+    connections[alias].close()
+
+
+def post_comment(alias, news_id):
+    """Как публикация комментария: вставка и счётчик в одной транзакции."""
+    with transaction.atomic(using=alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO bench_comment (news_id, text) VALUES (%s, %s)',
+                (news_id, 'Комментарий ' * 20),
+            )
+            cursor.execute(
+                'UPDATE bench_news SET comment_count = comment_count + 1 '
+                'WHERE id = %s',
+                (news_id,),
+            )
+
+
+def read_news(alias, news_id):
+    """Как страница новости: счётчик и последние комментарии."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            'SELECT comment_count FROM bench_news WHERE id = %s', (news_id,)
+        )
+        cursor.fetchone()
+        cursor.execute(
+            'SELECT id, text FROM bench_comment WHERE news_id = %s '
+            'ORDER BY id DESC LIMIT 10',
+            (news_id,),
+        )
+        cursor.fetchall()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает стандартный бэкенд sqlite3 и news.sqlite '
+        '(WAL, PRAGMA, постоянные соединения, повтор при блокировке) '
+        'на смеси конкурентных чтений и публикаций комментариев '
+        'во временных файлах базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, nargs='+',
+                            default=[1, 4, 16])
+        parser.add_argument('--operations', type=int, default=2000)
+        parser.add_argument('--write-share', type=float, default=0.3)
+        parser.add_argument('--news', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"backend":>8} {"threads":>7} {"ops/s":>8} {"p95, ms":>8} '
+            f'{"p99, ms":>8} {"locked":>7}'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for threads in options['threads']:
+                for name, backend in BACKENDS.items():
+                    alias = f'bench_{name}_{threads}'
+                    connections.databases[alias] = {
+                        **backend,
+                        'NAME': os.path.join(directory, f'{alias}.sqlite3'),
+                    }
+                    setup_schema(alias, options['news'])
+                    self.run(name, alias, threads, options)
+
+    def run(self, name, alias, threads, options):
+        rng = random.Random(options['seed'])
+        plan = [
+            (rng.random() < options['write_share'],
+             rng.randint(1, options['news']))
+            for _ in range(options['operations'])
+        ]
+        latencies = []
+        errors = Counter()
+        lock = threading.Lock()
+
+        def worker(chunk):
+            timings = []
+            failed = Counter()
+            for is_write, news_id in chunk:
+                started = time.perf_counter()
+                try:
+                    (post_comment if is_write else read_news)(alias, news_id)
+                except OperationalError as error:
+                    failed[str(error)] += 1
+                timings.append((time.perf_counter() - started) * 1000)
+                # Конец «запроса»: как сигнал request_finished, закрывает
+                # соединение, если CONN_MAX_AGE истёк.
+                connections[alias].close_if_unusable_or_obsolete()
+            connections[alias].close()
+            with lock:
+                latencies.extend(timings)
+                errors.update(failed)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(
+                worker, [plan[i::threads] for i in range(threads)]
+            ))
+        elapsed = time.perf_counter() - started
+        locked = sum(
+            count for message, count in errors.items() if 'locked' in message
+        )
+        self.stdout.write(
+            f'{name:>8} {threads:>7} {len(plan) / elapsed:>8.0f} '
+            f'{percentile(latencies, 0.95):>8.2f} '
+            f'{percentile(latencies, 0.99):>8.2f} {locked:>7}'
+        )
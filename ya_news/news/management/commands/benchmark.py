@@ -0,0 +1,269 @@
+import json
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+
+from news import urls
+from news.models import Comment, News
+
+User = get_user_model()
+
+# Кэш замера: сигналы сбрасывают теги, а замер очищает кэш, и рабочий
+# файловый кэш проекта трогать нельзя.
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    },
+}
+
+
+@contextmanager
+def isolated_environment():
+    """
+    Временные тестовые базы всех подключений и кэш в памяти.
+
+    Тестовую базу получает каждое подключение из DATABASES: шарды
+    заметок и реплики (они читают тестовую базу default через
+    TEST MIRROR), иначе синтетические данные попали бы в рабочие
+    файлы. Кэш на это время подменяется TEST_CACHES.
+    """
+    setup_test_environment()
+    try:
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases=set(connections)
+        )
+        try:
+            with override_settings(CACHES=TEST_CACHES):
+                yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+    finally:
+        teardown_test_environment()
+
+
+@dataclass
+class Scenario:
+    """Один замеряемый запрос: имя URL, метод и кто его делает."""
+    name: str
+    method: str
+    client: str
+    build: Callable
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    index = max(0, round(share * len(ordered) + 0.5) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def zipf_counts(total, size, exponent):
+    """Делит total между size элементами по закону Ципфа."""
+    weights = [1 / rank ** exponent for rank in range(1, size + 1)]
+    scale = total / sum(weights)
+    return [round(weight * scale) for weight in weights]
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует синтетические данные во временной тестовой базе, '
+        'прогоняет все URL из news/urls.py через тестовый клиент '
+        'и сохраняет p50/p95/p99, число запросов к БД и пик памяти в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=200)
+        parser.add_argument(
+            '--comments', type=int, default=50,
+            help='Среднее число комментариев на новость.',
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель Ципфа для распределения комментариев.',
+        )
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=30)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('-o', '--output', default='benchmark.json')
+
+    def handle(self, *args, **options):
+        with isolated_environment():
+            self.rng = random.Random(options['seed'])
+            self.generate(options)
+            results = self.run(options)
+        report = {
+            'project': 'ya_news',
+            'params': {
+                key: options[key] for key in (
+                    'news', 'comments', 'skew', 'users', 'requests',
+                    'cold', 'seed',
+                )
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Результаты сохранены в {options["output"]}')
+
+    def generate(self, options):
+        started = time.perf_counter()
+        User.objects.bulk_create(
+            User(username=f'user{i}') for i in range(options['users'])
+        )
+        self.users = list(User.objects.all())
+        today = date.today()
+        News.objects.bulk_create(
+            (
+                News(
+                    title=f'Новость {i}',
+                    text=f'Текст новости {i} ' * 20,
+                    date=today - timedelta(days=i),
+                )
+                for i in range(options['news'])
+            ),
+            batch_size=1000,
+        )
+        self.news_ids = list(News.objects.values_list('pk', flat=True))
+        counts = zipf_counts(
+            options['news'] * options['comments'],
+            len(self.news_ids),
+            options['skew'],
+        )
+        for news_id, count in zip(self.news_ids, counts):
+            Comment.objects.bulk_create(
+                (
+                    Comment(
+                        news_id=news_id,
+                        author=self.rng.choice(self.users),
+                        text=f'Комментарий {i}',
+                    )
+                    for i in range(count)
+                ),
+                batch_size=1000,
+            )
+        call_command('recount_comments', stdout=self.stderr)
+        call_command('recount_archive', stdout=self.stderr)
+        self.stderr.write(
+            f'Данные сгенерированы за {time.perf_counter() - started:.1f} с'
+        )
+
+    def own_comment(self):
+        return Comment.objects.create(
+            news_id=self.news_ids[0], author=self.users[0], text='Мой'
+        )
+
+    def scenarios(self):
+        popular = self.news_ids[0]
+        today = date.today()
+        return [
+            Scenario('news:home', 'get', 'anonymous',
+                     lambda: (reverse('news:home'), None)),
+            Scenario('news:detail', 'get', 'anonymous',
+                     lambda: (reverse('news:detail', args=(popular,)), None)),
+            Scenario('news:detail', 'get', 'author',
+                     lambda: (reverse('news:detail', args=(popular,)), None)),
+            Scenario('news:detail', 'post', 'author',
+                     lambda: (reverse('news:detail', args=(popular,)),
+                              {'text': 'Новый комментарий'})),
+            Scenario('news:search', 'get', 'anonymous',
+                     lambda: (reverse('news:search') + '?q=новость', None)),
+            Scenario('news:archive', 'get', 'anonymous',
+                     lambda: (reverse('news:archive'), None)),
+            Scenario('news:archive_year', 'get', 'anonymous',
+                     lambda: (reverse('news:archive_year',
+                                      args=(today.year,)), None)),
+            Scenario('news:archive_month', 'get', 'anonymous',
+                     lambda: (reverse('news:archive_month',
+                                      args=(today.year, today.month)), None)),
+            Scenario('news:edit', 'get', 'author',
+                     lambda: (reverse('news:edit',
+                                      args=(self.own_comment().pk,)), None)),
+            Scenario('news:edit', 'post', 'author',
+                     lambda: (reverse('news:edit',
+                                      args=(self.own_comment().pk,)),
+                              {'text': 'Исправлено'})),
+            Scenario('news:delete', 'get', 'author',
+                     lambda: (reverse('news:delete',
+                                      args=(self.own_comment().pk,)), None)),
+            Scenario('news:delete', 'post', 'author',
+                     lambda: (reverse('news:delete',
+                                      args=(self.own_comment().pk,)), {})),
+            Scenario('news:post_comment', 'post', 'author',
+                     lambda: (reverse('news:post_comment', args=(popular,)),
+                              {'text': 'Новый комментарий'})),
+        ]
+
+    def run(self, options):
+        clients = {'anonymous': Client(), 'author': Client()}
+        clients['author'].force_login(self.users[0])
+        scenarios = self.scenarios()
+        covered = {scenario.name for scenario in scenarios}
+        for pattern in urls.urlpatterns:
+            name = f'{urls.app_name}:{pattern.name}'
+            if name not in covered:
+                self.stderr.write(f'URL {name} не покрыт сценариями')
+        results = {}
+        for scenario in scenarios:
+            key = '{} {} ({})'.format(
+                scenario.method.upper(), scenario.name, scenario.client
+            )
+            results[key] = self.measure(
+                scenario, clients[scenario.client], options
+            )
+            self.stdout.write(
+                '{:<45} p50 {p50_ms:>8.2f} p95 {p95_ms:>8.2f} '
+                'p99 {p99_ms:>8.2f} ms, {queries:>3} запросов, '
+                '{peak_kib:>8.1f} KiB'.format(key, **results[key])
+            )
+        return results
+
+    def measure(self, scenario, client, options):
+        timings = []
+        queries = []
+        status = None
+        cache.clear()
+        for _ in range(options['requests']):
+            url, data = scenario.build()
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = getattr(client, scenario.method)(url, data)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            status = response.status_code
+        url, data = scenario.build()
+        tracemalloc.start()
+        getattr(client, scenario.method)(url, data)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            'status': status,
+            'p50_ms': percentile(timings, 0.50),
+            'p95_ms': percentile(timings, 0.95),
+            'p99_ms': percentile(timings, 0.99),
+            'mean_ms': sum(timings) / len(timings),
+            'queries': max(queries),
+            'peak_kib': peak / 1024,
+        }
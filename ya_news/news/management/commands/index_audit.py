@@ -0,0 +1,88 @@
+import random
+from pathlib import Path
+
+from django.core.cache import cache
+from django.db.migrations.writer import MigrationWriter
+from django.test import Client
+
+from news import urls
+from news.indexaudit import IndexAudit
+
+from . import benchmark
+
+
+class Command(benchmark.Command):
+    help = (
+        'Заполняет временную тестовую базу синтетическими данными, '
+        'проходит сценарии benchmark по всем URL из news/urls.py '
+        'и для каждого запроса смотрит EXPLAIN QUERY PLAN: сообщает '
+        'о полных проходах таблиц и сортировках во временном B-дереве '
+        'и предлагает составные индексы миграцией.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=200)
+        parser.add_argument('--comments', type=int, default=20)
+        parser.add_argument('--skew', type=float, default=1.1)
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--write', action='store_true',
+            help='Записать миграцию с индексами, а не только показать её.',
+        )
+
+    def handle(self, *args, **options):
+        with benchmark.isolated_environment():
+            self.rng = random.Random(options['seed'])
+            self.generate(options)
+            audit = self.audit()
+        self.report(audit, options)
+
+    def audit(self):
+        audit = IndexAudit(urls.app_name)
+        clients = {'anonymous': Client(), 'author': Client()}
+        clients['author'].force_login(self.users[0])
+        for scenario in self.scenarios():
+            url, data = scenario.build()
+            cache.clear()
+            with audit.capture(f'{scenario.method.upper()} {scenario.name}'):
+                getattr(clients[scenario.client], scenario.method)(url, data)
+        return audit
+
+    def report(self, audit, options):
+        problems = audit.problems()
+        for finding in problems:
+            self.stdout.write(
+                f'{", ".join(finding.scenarios)}: '
+                f'{"; ".join(finding.problems)}'
+            )
+            self.stdout.write(f'  {finding.sql}')
+            for step in finding.plan:
+                self.stdout.write(f'    {step}')
+            if finding.index is not None:
+                self.stdout.write(
+                    f'  предлагается индекс {finding.index.name} '
+                    f'({", ".join(finding.index.fields)})'
+                )
+        self.stdout.write(
+            f'Проверено форм запросов: {audit.checked}, '
+            f'с проблемами: {len(problems)}'
+        )
+        migration = audit.migration()
+        if migration is None:
+            return
+        writer = MigrationWriter(migration)
+        if options['write']:
+            Path(writer.path).write_text(writer.as_string(), encoding='utf-8')
+            self.stdout.write(f'Миграция записана в {writer.path}')
+        else:
+            self.stdout.write(writer.as_string())
+        # Без индекса в Meta.indexes следующий makemigrations
+        # предложит его удалить.
+        self.stdout.write('Добавьте индексы в Meta.indexes моделей вручную:')
+        for operation in migration.operations:
+            index = operation.index
+            self.stdout.write(
+                f'  {operation.model_name}: models.Index('
+                f'fields={tuple(index.fields)!r}, name={index.name!r}),'
+            )
@@ -0,0 +1,117 @@
+import sys
+import time
+from contextlib import contextmanager
+
+from django.core import serializers
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+
+
+@contextmanager
+def keep_dumped_dates(model):
+    """
+    Отключает auto_now и auto_now_add у полей модели на время загрузки.
+
+    Иначе bulk_create через pre_save заменил бы выгруженные даты
+    временем загрузки и сломал порядок (created, id) у курсоров.
+    """
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.DateField)
+        and (field.auto_now or field.auto_now_add)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает NDJSON, выгруженный dump_ndjson, потоком: объекты '
+        'читаются построчно и сохраняются пачками через bulk_create '
+        'вместе со связями многие-ко-многим, каждая пачка в своей '
+        'транзакции; даты auto_now_add сохраняются. После загрузки '
+        'пересчитываются счётчики комментариев и архива.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл NDJSON; "-" — читать из stdin.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        stream = (
+            sys.stdin if path == '-' else open(path, encoding='utf-8')
+        )
+        self.batch_size = options['batch_size']
+        self.total = 0
+        self.next_report = self.batch_size * 50
+        self.started = time.perf_counter()
+        batch = []
+        try:
+            objects = serializers.deserialize(
+                'jsonl', stream, ignorenonexistent=True
+            )
+            for deserialized in objects:
+                instance = deserialized.object
+                if batch and type(instance) is not type(batch[0][0]):
+                    self.flush(batch)
+                    batch = []
+                batch.append((instance, deserialized.m2m_data))
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = []
+            if batch:
+                self.flush(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        call_command('recount_comments', stdout=self.stderr)
+        call_command('recount_archive', stdout=self.stderr)
+        elapsed = time.perf_counter() - self.started
+        self.stderr.write(
+            f'Загружено объектов: {self.total} за {elapsed:.1f} с '
+            f'({self.total / max(elapsed, 1e-9):.0f} строк/с)'
+        )
+
+    def flush(self, batch):
+        """Сохраняет пачку объектов одной модели одним bulk_create."""
+        model = type(batch[0][0])
+        with transaction.atomic(), keep_dumped_dates(model):
+            model._default_manager.bulk_create(
+                instance for instance, _ in batch
+            )
+            self.save_m2m(model, batch)
+        self.total += len(batch)
+        if self.total >= self.next_report:
+            self.next_report += self.batch_size * 50
+            elapsed = time.perf_counter() - self.started
+            self.stderr.write(
+                f'{self.total} объектов, '
+                f'{self.total / max(elapsed, 1e-9):.0f} строк/с'
+            )
+
+    def save_m2m(self, model, batch):
+        """Связи многие-ко-многим пачки: по bulk_create на связь."""
+        rows = {}
+        for instance, m2m_data in batch:
+            for name, values in m2m_data.items():
+                rows.setdefault(name, []).extend(
+                    (instance.pk, value) for value in values
+                )
+        for name, pairs in rows.items():
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            source = field.m2m_field_name() + '_id'
+            target = field.m2m_reverse_field_name() + '_id'
+            through._default_manager.bulk_create(
+                through(**{source: pk, target: value}) for pk, value in pairs
+            )
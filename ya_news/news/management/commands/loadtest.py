@@ -0,0 +1,283 @@
+import io
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from importlib import import_module
+from urllib.parse import quote, urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+)
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import got_request_exception
+from django.db import connections
+from django.utils.crypto import get_random_string
+from django.utils.module_loading import import_string
+
+from news.models import News
+
+User = get_user_model()
+
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+_local = threading.local()
+
+
+def _remember_exception(sender, request=None, **kwargs):
+    """Запоминает текст исключения, из-за которого запрос вернул 500."""
+    _local.error = str(sys.exc_info()[1])
+
+
+def _environ(entry, cookies):
+    url = urlsplit(entry['path'])
+    method = entry.get('method', 'GET').upper()
+    body = b''
+    if entry.get('data') is not None:
+        body = urlencode(entry['data'], doseq=True).encode()
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path.encode().decode('latin-1'),
+        'QUERY_STRING': quote(url.query, safe='=&%+'),
+        'SERVER_NAME': '127.0.0.1',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': '127.0.0.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'CONTENT_LENGTH': str(len(body)),
+        'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+    }
+    user_cookies = cookies.get(entry.get('user'))
+    if user_cookies:
+        environ['HTTP_COOKIE'] = '; '.join(
+            f'{name}={value}' for name, value in user_cookies.items()
+        )
+        environ['HTTP_X_CSRFTOKEN'] = user_cookies[settings.CSRF_COOKIE_NAME]
+    return environ
+
+
+def run_requests(entries, cookies):
+    """
+    Выполняет запросы через WSGI-приложение проекта.
+
+    Возвращает список (статус, задержка в мс, текст ошибки или None).
+    Функция модульного уровня, чтобы её можно было отдать в процесс.
+    """
+    application = import_string(settings.WSGI_APPLICATION)
+    got_request_exception.connect(_remember_exception)
+    results = []
+    for entry in entries:
+        _local.error = None
+        status = []
+        started = time.perf_counter()
+        try:
+            response = application(
+                _environ(entry, cookies),
+                lambda code, headers, exc_info=None: status.append(code),
+            )
+            for _ in response:
+                pass
+            response.close()
+            code = int(status[0].split()[0])
+        except Exception as error:
+            code, _local.error = 0, str(error)
+        latency = (time.perf_counter() - started) * 1000
+        results.append((code, latency, _local.error))
+    connections.close_all()
+    return results
+
+
+def _close_connections():
+    connections.close_all()
+
+
+def login_cookies(user):
+    """Сессия и CSRF-токен, как после входа пользователя на сайт."""
+    store = import_module(settings.SESSION_ENGINE).SessionStore()
+    store[SESSION_KEY] = str(user.pk)
+    store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    store.save()
+    return {
+        settings.SESSION_COOKIE_NAME: store.session_key,
+        settings.CSRF_COOKIE_NAME: get_random_string(32),
+    }
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    index = max(0, round(share * len(ordered) + 0.5) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест: воспроизводит журнал запросов (NDJSON со '
+        'строками {"method", "path", "user", "data"}) или синтетическую '
+        'смесь чтений и записей комментариев против yanews.wsgi '
+        'из пула потоков или процессов. Работает с настроенной базой '
+        'данных: запросы на запись действительно сохраняют комментарии.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log', help='Журнал запросов для воспроизведения.',
+        )
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument(
+            '--mode', choices=('thread', 'process'), default='thread',
+        )
+        parser.add_argument(
+            '--write-share', type=float, default=0.2,
+            help='Доля записей в синтетической смеси.',
+        )
+        parser.add_argument(
+            '--users', type=int, default=10,
+            help='Сколько пользователей loadtest_N использовать.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '-o', '--output', help='Сохранить сводку в JSON.',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        users = [
+            User.objects.get_or_create(username=f'loadtest_{i}')[0]
+            for i in range(options['users'])
+        ]
+        if options['log']:
+            entries = self.read_log(options['log'])
+        else:
+            entries = self.synthetic(rng, users, options)
+        entries = [
+            entries[i % len(entries)] for i in range(options['requests'])
+        ]
+        names = {entry.get('user') for entry in entries} - {None}
+        cookies = {
+            user.username: login_cookies(user)
+            for user in User.objects.filter(username__in=names)
+        }
+        chunks = [
+            entries[i::options['workers']]
+            for i in range(options['workers'])
+        ]
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        connections.close_all()
+        executor_class = (
+            ThreadPoolExecutor if options['mode'] == 'thread'
+            else ProcessPoolExecutor
+        )
+        extra = (
+            {} if options['mode'] == 'thread'
+            else {'initializer': _close_connections}
+        )
+        started = time.perf_counter()
+        with executor_class(options['workers'], **extra) as executor:
+            futures = [
+                executor.submit(run_requests, chunk, cookies)
+                for chunk in chunks
+            ]
+            results = [row for future in futures for row in future.result()]
+        elapsed = time.perf_counter() - started
+        summary = self.summarize(results, elapsed, options)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(summary, file, ensure_ascii=False, indent=2)
+
+    def read_log(self, path):
+        try:
+            with open(path, encoding='utf-8') as file:
+                entries = [json.loads(line) for line in file if line.strip()]
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать журнал: {error}')
+        if not entries:
+            raise CommandError('Журнал запросов пуст.')
+        return entries
+
+    def synthetic(self, rng, users, options):
+        """Смесь чтений страниц новостей и публикаций комментариев."""
+        news_ids = list(News.objects.values_list('pk', flat=True)[:1000])
+        if not news_ids:
+            raise CommandError(
+                'В базе нет новостей: загрузите данные через load_ndjson.'
+            )
+        reads = ('/', '/archive/', '/search/?q=новость')
+        entries = []
+        for i in range(options['requests']):
+            news_id = rng.choice(news_ids)
+            user = rng.choice(users).username
+            if rng.random() < options['write_share']:
+                entries.append({
+                    'method': 'POST',
+                    'path': f'/post_comment/{news_id}/',
+                    'user': user,
+                    'data': {'text': f'Нагрузочный комментарий {i}'},
+                })
+            elif rng.random() < 0.5:
+                entries.append({'path': f'/news/{news_id}/', 'user': user})
+            else:
+                entries.append({'path': rng.choice(reads)})
+        return entries
+
+    def summarize(self, results, elapsed, options):
+        latencies = [latency for _, latency, _ in results]
+        statuses = Counter(code for code, _, _ in results)
+        errors = Counter(
+            'database is locked' if 'locked' in error else error[:80]
+            for _, _, error in results if error
+        )
+        histogram = Counter()
+        for latency in latencies:
+            bound = next(
+                (b for b in HISTOGRAM_BOUNDS_MS if latency <= b), None
+            )
+            histogram[f'<= {bound} ms' if bound else '> 5000 ms'] += 1
+        summary = {
+            'mode': options['mode'],
+            'workers': options['workers'],
+            'requests': len(results),
+            'seconds': elapsed,
+            'throughput_rps': len(results) / elapsed,
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'statuses': dict(statuses),
+            'error_rate': sum(errors.values()) / len(results),
+            'errors': dict(errors),
+            'histogram': dict(histogram),
+        }
+        self.stdout.write(
+            f'{summary["requests"]} запросов за {elapsed:.1f} с, '
+            f'{summary["throughput_rps"]:.0f} запр/с, '
+            f'{options["workers"]} {options["mode"]}'
+        )
+        self.stdout.write(
+            'p50 {p50_ms:.1f} ms, p95 {p95_ms:.1f} ms, '
+            'p99 {p99_ms:.1f} ms'.format(**summary)
+        )
+        self.stdout.write(f'Статусы: {dict(statuses)}')
+        self.stdout.write(
+            f'Ошибки: {summary["error_rate"]:.1%} {dict(errors)}'
+        )
+        widest = max(histogram.values(), default=1)
+        for bound in HISTOGRAM_BOUNDS_MS + (None,):
+            label = f'<= {bound} ms' if bound else '> 5000 ms'
+            count = histogram.get(label, 0)
+            bar = '#' * round(40 * count / widest)
+            self.stdout.write(f'{label:>12} {count:>7} {bar}')
+        return summary
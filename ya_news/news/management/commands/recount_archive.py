@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from news.models import News, NewsPeriod
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает число новостей по месяцам для страниц архива.'
+
+    def handle(self, *args, **options):
+        periods = News.objects.annotate(
+            year=ExtractYear('date'), month=ExtractMonth('date')
+        ).order_by().values('year', 'month').annotate(news_count=Count('pk'))
+        with transaction.atomic():
+            NewsPeriod.objects.all().delete()
+            created = NewsPeriod.objects.bulk_create(
+                NewsPeriod(**period) for period in periods
+            )
+        self.stdout.write(f'Пересчитано периодов: {len(created)}')
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from news.models import Comment, News
+
+
+def actual_comment_count():
+    """Подзапрос с реальным числом комментариев новости."""
+    counts = Comment.objects.filter(
+        news=OuterRef('pk')
+    ).order_by().values('news').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts), Value(0))
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает и исправляет счётчики комментариев у новостей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько счётчиков расходится.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            broken = News.objects.annotate(
+                actual=actual_comment_count()
+            ).exclude(comment_count=F('actual'))
+            broken_ids = list(broken.values_list('pk', flat=True))
+            if not options['dry_run'] and broken_ids:
+                News.objects.filter(pk__in=broken_ids).update(
+                    comment_count=actual_comment_count()
+                )
+        action = 'Найдено' if options['dry_run'] else 'Исправлено'
+        self.stdout.write(f'{action} счётчиков: {len(broken_ids)}')
@@ -0,0 +1,94 @@
+import json
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from news.querybudget import query_shape
+
+SORT_KEYS = {
+    'total': lambda group: group['total'],
+    'count': lambda group: group['count'],
+    'max': lambda group: group['max'],
+}
+
+
+def log_files():
+    """Текущий файл журнала и его ротированные копии, от старых к новым."""
+    log = Path(settings.SLOW_QUERY_LOG)
+    backups = [
+        log.with_name(f'{log.name}.{number}')
+        for number in range(settings.SLOW_QUERY_LOG_BACKUPS, 0, -1)
+    ]
+    return [path for path in (*backups, log) if path.exists()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка журнала медленных запросов: записи группируются по форме '
+        'запроса (SQL без значений), для каждой формы — число, суммарное '
+        'и худшее время, частые места вызова и план худшего запроса.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files', nargs='*',
+            help='Файлы NDJSON; по умолчанию SLOW_QUERY_LOG с копиями.',
+        )
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='total',
+            help='Порядок групп: по суммарному времени, числу или худшему.',
+        )
+
+    def handle(self, *args, **options):
+        files = [Path(name) for name in options['files']] or log_files()
+        if not files:
+            raise CommandError(
+                f'Журнал медленных запросов пуст: {settings.SLOW_QUERY_LOG}'
+            )
+        groups = defaultdict(lambda: {
+            'count': 0, 'total': 0.0, 'max': 0.0, 'rows': 0,
+            'callers': Counter(), 'worst': None,
+        })
+        skipped = 0
+        for path in files:
+            with open(path, encoding='utf-8') as stream:
+                for line in stream:
+                    try:
+                        entry = json.loads(line)
+                        shape = query_shape(entry['sql'])
+                        duration = float(entry['ms'])
+                    except (ValueError, KeyError, TypeError):
+                        skipped += 1
+                        continue
+                    group = groups[shape]
+                    group['count'] += 1
+                    group['total'] += duration
+                    group['rows'] += max(entry.get('rows') or 0, 0)
+                    group['callers'][entry.get('caller')] += 1
+                    if duration >= group['max']:
+                        group['max'] = duration
+                        group['worst'] = entry
+        sort_key = SORT_KEYS[options['sort']]
+        ordered = sorted(
+            groups.items(), key=lambda item: sort_key(item[1]), reverse=True
+        )
+        for shape, group in ordered[:options['top']]:
+            self.stdout.write(
+                f'{group["count"]} раз, всего {group["total"]:.1f} мс, '
+                f'в среднем {group["total"] / group["count"]:.1f} мс, '
+                f'худший {group["max"]:.1f} мс, '
+                f'строк в среднем {group["rows"] / group["count"]:.0f}'
+            )
+            self.stdout.write(f'  {shape}')
+            for caller, count in group['callers'].most_common(3):
+                self.stdout.write(f'  {count} × {caller}')
+            for step in group['worst'].get('plan') or ():
+                self.stdout.write(f'    {step}')
+        self.stdout.write(
+            f'Форм запросов: {len(groups)}, '
+            f'записей: {sum(g["count"] for g in groups.values())}'
+            + (f', пропущено строк: {skipped}' if skipped else '')
+        )
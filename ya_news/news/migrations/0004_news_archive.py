@@ -0,0 +1,49 @@
+# Generated by Django 3.2.15 on 2026-10-18 15:45
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def fill_news_periods(apps, schema_editor):
+    News = apps.get_model('news', 'News')
+    NewsPeriod = apps.get_model('news', 'NewsPeriod')
+    periods = News.objects.annotate(
+        year=ExtractYear('date'), month=ExtractMonth('date')
+    ).order_by().values('year', 'month').annotate(news_count=Count('pk'))
+    NewsPeriod.objects.bulk_create(
+        NewsPeriod(**period) for period in periods
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_comment_news_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('news_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Период архива',
+                'verbose_name_plural': 'Периоды архива',
+                'ordering': ('-year', '-month'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['-date', '-id'], name='news_date_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='newsperiod',
+            constraint=models.UniqueConstraint(fields=('year', 'month'), name='unique_news_period'),
+        ),
+        migrations.RunPython(fill_news_periods, migrations.RunPython.noop),
+    ]
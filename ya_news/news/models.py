@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 
 from django.conf import settings
 from django.db import models
@@ -8,16 +8,49 @@ class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ('-date',)
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
+        indexes = (
+            models.Index(fields=('-date', '-id'), name='news_date_id_idx'),
+        )
 
     def __str__(self):
         return self.title
 
 
+class NewsPeriod(models.Model):
+    """
+    Число новостей за месяц для страниц архива.
+
+    Счётчики поддерживаются сигналами при сохранении и удалении новостей,
+    поэтому архиву не нужно считать новости на лету.
+    """
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    news_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ('-year', '-month')
+        verbose_name_plural = 'Периоды архива'
+        verbose_name = 'Период архива'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('year', 'month'), name='unique_news_period'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.month:02}.{self.year}: {self.news_count}'
+
+    @property
+    def start(self):
+        return date(self.year, self.month, 1)
+
+
 class Comment(models.Model):
     news = models.ForeignKey(
         News,
@@ -32,6 +65,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
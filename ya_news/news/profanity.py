@@ -0,0 +1,88 @@
+import os
+import re
+import threading
+
+
+def build_pattern(words):
+    """
+    Собирает одно регулярное выражение из словаря.
+
+    Слова складываются в префиксное дерево, и общие префиксы выносятся
+    за скобки: 'негодяй', 'негодник' -> 'негод(?:яй|ник)'. Такое
+    выражение проверяется за один проход по тексту и почти не замедляется
+    с ростом словаря, в отличие от отдельного поиска каждого слова.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    if not trie:
+        return None
+    return re.compile(_trie_to_regex(trie))
+
+
+def _trie_to_regex(node):
+    # Слово закончилось здесь: его продолжения для поиска «содержит ли
+    # текст запрещённое слово» проверять не нужно.
+    if '' in node:
+        return ''
+    branches = [
+        re.escape(char) + _trie_to_regex(child)
+        for char, child in sorted(node.items())
+    ]
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')'
+
+
+class BadWordsMatcher:
+    """
+    Поиск запрещённых слов из файла со словарём.
+
+    Файл — по одному слову в строке, строки с # игнорируются.
+    При изменении файла словарь перечитывается автоматически.
+    """
+
+    def __init__(self, path=None, words=()):
+        self.path = path
+        self.default_words = tuple(words)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._pattern = build_pattern(self._normalize(self.default_words))
+
+    def _normalize(self, words):
+        return {word.strip().lower() for word in words if word.strip()}
+
+    def _read_words(self):
+        with open(self.path, encoding='utf-8') as file:
+            return self._normalize(
+                line for line in file if not line.lstrip().startswith('#')
+            )
+
+    def reload_if_changed(self):
+        """Перечитывает словарь, если файл изменился с прошлой загрузки."""
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime != self._mtime:
+                words = self._read_words() | self._normalize(
+                    self.default_words
+                )
+                self._pattern = build_pattern(words)
+                self._mtime = mtime
+
+    def search(self, text):
+        """Возвращает первое найденное запрещённое слово или None."""
+        self.reload_if_changed()
+        if self._pattern is None:
+            return None
+        match = self._pattern.search(text.lower())
+        return match.group() if match else None
@@ -0,0 +1,115 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SALT = 'profiling'
+PROFILE_TOKEN = 'profile'
+# <представление>__<мс>ms__<время>_<pid>.prof, «:» в имени заменено точкой.
+PROFILE_NAME = re.compile(
+    r'^(?P<view>[\w.-]+)__(?P<ms>\d+)ms__(?P<stamp>\w+)\.prof$'
+)
+UNSAFE = re.compile(r'[^\w.-]')
+
+
+def profile_token():
+    """Подписанный токен для заголовка или параметра запроса."""
+    return signing.TimestampSigner(salt=PROFILE_SALT).sign(PROFILE_TOKEN)
+
+
+def valid_token(token):
+    try:
+        value = signing.TimestampSigner(salt=PROFILE_SALT).unsign(
+            token, max_age=settings.PROFILE_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return value == PROFILE_TOKEN
+
+
+def profile_requested(request):
+    """
+    Нужно ли профилировать запрос.
+
+    Явно — по подписанному токену в заголовке PROFILE_HEADER или
+    в параметре PROFILE_QUERY_FLAG, иначе — случайно с долей
+    PROFILE_SAMPLE_RATE. Без подписи профиль мог бы включить кто
+    угодно, а профилирование замедляет запрос в разы.
+    """
+    token = (
+        request.headers.get(settings.PROFILE_HEADER)
+        or request.GET.get(settings.PROFILE_QUERY_FLAG)
+    )
+    if token:
+        return valid_token(token)
+    return random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+def profile_path(view_name, duration):
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+    view = UNSAFE.sub('_', (view_name or 'unresolved').replace(':', '.'))
+    name = f'{view}__{round(duration * 1000)}ms__{stamp}_{os.getpid()}.prof'
+    return Path(settings.PROFILE_DIR) / name
+
+
+def view_name(path):
+    """Имя представления из имени файла профиля или None."""
+    match = PROFILE_NAME.match(Path(path).name)
+    return match['view'].replace('.', ':', 1) if match else None
+
+
+def prune_profiles(directory, keep):
+    """Оставляет в каталоге keep самых новых профилей."""
+    profiles = sorted(
+        Path(directory).glob('*.prof'), key=lambda path: path.stat().st_mtime
+    )
+    for path in profiles[:max(len(profiles) - keep, 0)]:
+        path.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует выбранные запросы через cProfile.
+
+    Профиль сохраняется в PROFILE_DIR файлом с именем представления
+    и временем ответа; в каталоге остаются PROFILE_MAX_FILES новых
+    файлов. Сводку по представлениям печатает команда profile_report.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profile_requested(request):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # С Python 3.12 в потоке может работать только один
+            # профилировщик — например, когда запрос уже под отладчиком.
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        path = profile_path(match.view_name if match else None, duration)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(path)
+            prune_profiles(path.parent, settings.PROFILE_MAX_FILES)
+        except OSError:
+            logger.exception('Не удалось сохранить профиль %s', path)
+        return response
@@ -0,0 +1,130 @@
+import json
+from pathlib import Path
+
+import pytest
+from django.conf import settings
+from django.urls import resolve
+
+from .querybudget import record_queries
+
+SNAPSHOT_FILE = 'query_counts.json'
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--update-query-snapshots', action='store_true',
+        help='Записать новые и перезаписать изменившиеся снимки числа '
+             'запросов в query_counts.json.',
+    )
+
+
+class QuerySnapshots:
+    """
+    Снимки числа SQL-запросов страниц из одного query_counts.json.
+
+    Рост числа запросов и страница без снимка роняют тест: иначе
+    регрессия на новой странице молча записалась бы как норма. Новые
+    снимки и снимки после намеренных изменений записываются запуском
+    с --update-query-snapshots.
+    """
+
+    def __init__(self, path, update):
+        self.path = path
+        self.update = update
+        self.counts = (
+            json.loads(path.read_text(encoding='utf-8'))
+            if path.exists() else {}
+        )
+        self.changed = False
+
+    def check(self, key, log):
+        expected = self.counts.get(key)
+        if self.update and expected != len(log):
+            self.counts[key] = len(log)
+            self.changed = True
+            return
+        queries = '\n'.join(query.sql for query in log.queries)
+        if expected is None:
+            pytest.fail(
+                f'{key}: нет снимка в {self.path.name} ({len(log)} '
+                f'запросов). Запишите его запуском с '
+                f'--update-query-snapshots.\n{queries}',
+                pytrace=False,
+            )
+        if len(log) > expected:
+            pytest.fail(
+                f'{key}: {len(log)} запросов вместо {expected}. '
+                f'Если рост ожидаем, запустите тесты с '
+                f'--update-query-snapshots.\n{queries}',
+                pytrace=False,
+            )
+
+    def save(self):
+        if self.changed:
+            self.path.write_text(
+                json.dumps(
+                    self.counts, ensure_ascii=False, indent=2, sort_keys=True
+                ) + '\n',
+                encoding='utf-8',
+            )
+
+
+class QueryCounter:
+    """Выполняет запрос клиентом и сверяет число SQL-запросов со снимком."""
+
+    def __init__(self, snapshots):
+        self.snapshots = snapshots
+
+    def __call__(self, client, url, method='get', data=None, label=''):
+        with record_queries() as log:
+            response = getattr(client, method)(url, data or {})
+        key = f'{method.upper()} {resolve(url.split("?")[0]).view_name}'
+        if label:
+            key = f'{key} ({label})'
+        repeated = log.repeated(settings.QUERY_REPEAT_LIMIT)
+        if repeated:
+            pytest.fail(
+                f'{key}: похоже на N+1:\n' + '\n'.join(
+                    f'{count} раз: {shape}'
+                    for shape, count in repeated.items()
+                ),
+                pytrace=False,
+            )
+        self.snapshots.check(key, log)
+        return response
+
+
+@pytest.fixture(autouse=True)
+def raise_query_budget(settings):
+    """
+    В тестах нарушение бюджета запросов роняет запрос.
+
+    Тесты идут с DEBUG = False, и без этого QueryBudgetMiddleware
+    только писала бы нарушения в лог.
+    """
+    settings.QUERY_BUDGET_RAISE = True
+
+
+@pytest.fixture(scope='session')
+def query_snapshots(request):
+    by_path = {}
+    yield by_path
+    for snapshots in by_path.values():
+        snapshots.save()
+
+
+@pytest.fixture
+def query_counts(request, query_snapshots):
+    """
+    Запрос к странице со сверкой числа SQL-запросов.
+
+    query_counts(client, url) выполняет GET, query_counts(client, url,
+    'post', data) — POST. Ключ снимка — метод и имя маршрута, label
+    различает разные сценарии одной страницы.
+    """
+    path = Path(request.node.fspath).parent / SNAPSHOT_FILE
+    if path not in query_snapshots:
+        query_snapshots[path] = QuerySnapshots(
+            path, request.config.getoption('update_query_snapshots')
+        )
+    return QueryCounter(query_snapshots[path])
@@ -1,13 +1,41 @@
 import pytest
 
 from django.contrib.auth import get_user_model
+from django.conf import settings as django_settings
+from django.core.cache import cache
 from django.test import Client
 
+from news.pytest_plugin import (  # noqa: F401
+    pytest_addoption, query_counts, query_snapshots, raise_query_budget,
+)
+
 from news.models import News, Comment
 
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True, scope="session")
+def cache_location(tmp_path_factory):
+    """Кэш тестов лежит во временном каталоге, а не в кэше проекта."""
+    django_settings.CACHES["default"]["LOCATION"] = (
+        tmp_path_factory.mktemp("django_cache")
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def slow_query_log(settings, tmp_path):
+    """Медленные запросы тестов пишутся во временный файл."""
+    settings.SLOW_QUERY_LOG = tmp_path / "slow_queries.ndjson"
+    return settings.SLOW_QUERY_LOG
+
+
 @pytest.fixture
 def user():
     return User.objects.create_user(username="testuser", password="testpass")
@@ -1,3 +1,5 @@
+from datetime import date
+
 import pytest
 
 from django.urls import reverse
@@ -5,6 +7,7 @@ from django.utils import timezone
 
 from news.models import News, Comment
 from news.forms import CommentForm
+from news.querybudget import QueryBudgetExceeded, query_shape
 
 
 @pytest.mark.django_db
@@ -82,3 +85,296 @@ def test_authorized_user_can_access_comment_form(author_client):
 
     assert "form" in response.context
     assert isinstance(response.context["form"], CommentForm)
+
+
+@pytest.mark.django_db
+def test_home_page_comment_count(client, author_client):
+    _, user = author_client
+    news = News.objects.create(title="Новость", text="Содержимое")
+    for i in range(3):
+        Comment.objects.create(
+            text=f"Комментарий {i}", news=news, author=user
+        )
+
+    response = client.get(reverse("news:home"))
+
+    assert response.context["object_list"][0].comment_count == 3
+    assert "Комментариев: 3" in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_home_page_queries_do_not_grow_with_comments(
+    client, author_client, django_assert_num_queries
+):
+    _, user = author_client
+    news = News.objects.create(title="Новость", text="Содержимое")
+    url = reverse("news:home")
+    with django_assert_num_queries(1):
+        client.get(url)
+    for i in range(50):
+        Comment.objects.create(
+            text=f"Комментарий {i}", news=news, author=user
+        )
+    with django_assert_num_queries(1):
+        client.get(url)
+
+
+@pytest.fixture
+def paged_comments(settings, author_client):
+    settings.COMMENTS_COUNT_ON_DETAIL_PAGE = 3
+    _, user = author_client
+    news = News.objects.create(title="Новость", text="Содержимое")
+    comments = [
+        Comment.objects.create(text=f"Комментарий {i}", news=news, author=user)
+        for i in range(8)
+    ]
+    return news, comments
+
+
+@pytest.mark.django_db
+def test_comments_keyset_pages(client, paged_comments):
+    news, comments = paged_comments
+    url = reverse("news:detail", args=(news.id,))
+
+    seen = []
+    query = ""
+    while True:
+        response = client.get(url + query)
+        page = response.context["page"]
+        seen.extend(response.context["comments"])
+        if not page.has_next:
+            break
+        query = "?" + page.next_query
+
+    assert seen == comments
+    response = client.get(url + "?" + page.previous_query)
+    assert list(response.context["comments"]) == comments[3:6]
+
+
+@pytest.mark.django_db
+def test_deep_comment_page_costs_same_as_first(
+    client, paged_comments, django_assert_max_num_queries
+):
+    news, comments = paged_comments
+    url = reverse("news:detail", args=(news.id,))
+    first_page = client.get(url).context["page"]
+    # ETag новости, новость, страница комментариев и проверка соседней.
+    with django_assert_max_num_queries(4):
+        response = client.get(url + "?" + first_page.next_query)
+    assert list(response.context["comments"]) == comments[3:6]
+
+
+@pytest.mark.django_db
+def test_comment_redirect_lands_on_its_page(author_client, paged_comments):
+    client, user = author_client
+    news, comments = paged_comments
+    url = reverse("news:detail", args=(news.id,))
+
+    response = client.post(url, data={"text": "Свежий комментарий"})
+    assert response.url.endswith("#comments")
+    new_comment = Comment.objects.latest("id")
+    response = client.get(response.url)
+    assert list(response.context["comments"])[-1] == new_comment
+
+    edit_url = reverse("news:edit", args=(comments[1].id,))
+    response = client.post(edit_url, data={"text": "Исправленный"})
+    response = client.get(response.url)
+    assert list(response.context["comments"]) == comments[:2]
+
+
+@pytest.fixture
+def archive_news(settings, db):
+    settings.NEWS_COUNT_ON_ARCHIVE_PAGE = 2
+    dates = [
+        date(2023, 1, 5), date(2023, 1, 20), date(2023, 3, 1),
+        date(2024, 2, 2), date(2024, 2, 2),
+    ]
+    return [
+        News.objects.create(title=f"Новость {i}", text="Текст", date=day)
+        for i, day in enumerate(dates)
+    ]
+
+
+@pytest.mark.django_db
+def test_archive_pages_follow_date_keyset(client, archive_news):
+    url = reverse("news:archive")
+    seen = []
+    query = ""
+    while True:
+        response = client.get(url + query)
+        page = response.context["page"]
+        seen.extend(response.context["object_list"])
+        if not page.has_next:
+            break
+        query = "?" + page.next_query
+
+    expected = sorted(
+        archive_news, key=lambda news: (news.date, news.id), reverse=True
+    )
+    assert seen == expected
+    assert response.context["period_count"] == 5
+
+
+@pytest.mark.django_db
+def test_archive_month_counts_are_precomputed(
+    client, archive_news, django_assert_num_queries
+):
+    url = reverse("news:archive_month", args=(2023, 1))
+    with django_assert_num_queries(2):
+        response = client.get(url)
+    assert response.context["period_count"] == 2
+    assert set(response.context["object_list"]) == set(archive_news[:2])
+
+
+@pytest.mark.django_db
+def test_archive_counts_follow_news_changes(client, archive_news):
+    news = archive_news[2]
+    news.date = date(2024, 2, 10)
+    news.save()
+    archive_news[0].delete()
+
+    url = reverse("news:archive_year", args=(2024,))
+    assert client.get(url).context["period_count"] == 3
+    url = reverse("news:archive_year", args=(2023,))
+    assert client.get(url).context["period_count"] == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "args", ((9999, 12), (9999, 13), (2023, 0), (0,), (10000,))
+)
+def test_archive_unknown_period_is_404(client, args):
+    name = "news:archive_month" if len(args) == 2 else "news:archive_year"
+    assert client.get(reverse(name, args=args)).status_code == 404
+
+
+@pytest.mark.django_db
+def test_comment_block_cached_with_own_links(
+    author_client, not_author_client, comment_item, django_assert_num_queries
+):
+    client, _ = author_client
+    url = reverse("news:detail", args=(comment_item.news_id,))
+    edit_url = reverse("news:edit", args=(comment_item.id,))
+    assert edit_url in client.get(url).content.decode()
+
+    # Сессия, пользователь и новость (одна для ETag и страницы);
+    # комментарии берутся из кэша.
+    with django_assert_num_queries(3):
+        response = not_author_client.get(url)
+    assert "comments" not in response.context
+    content = response.content.decode()
+    assert comment_item.text in content
+    assert edit_url not in content
+    assert "comment-actions" not in content
+
+
+@pytest.mark.django_db
+def test_search_ranks_and_highlights(client, settings):
+    settings.NEWS_COUNT_ON_SEARCH_PAGE = 1
+    in_text = News.objects.create(
+        title="Погода", text="Завтра ожидается <b>гроза</b> и ливень"
+    )
+    in_title = News.objects.create(title="Гроза над городом", text="Текст")
+    News.objects.create(title="Спорт", text="Ничего интересного")
+
+    url = reverse("news:search")
+    response = client.get(url, {"q": "гроз"})
+    first = response.context["object_list"]
+    assert first == [in_title]
+    assert "<mark>Гроза</mark>" in first[0].title_highlight
+
+    response = client.get(url + "?" + response.context["next_query"])
+    second = response.context["object_list"]
+    assert second == [in_text]
+    assert "&lt;b&gt;<mark>гроза</mark>" in second[0].text_snippet
+    assert "next_query" not in response.context
+
+
+@pytest.mark.django_db
+def test_search_index_follows_changes(client):
+    news = News.objects.create(title="Старое название", text="Текст")
+    url = reverse("news:search")
+
+    news.title = "Новое название"
+    news.save()
+    assert client.get(url, {"q": "старое"}).context["object_list"] == []
+    assert client.get(url, {"q": "новое"}).context["object_list"] == [news]
+
+    news.delete()
+    assert client.get(url, {"q": "новое"}).context["object_list"] == []
+    assert client.get(url, {"q": 'AND "('}).status_code == 200
+
+
+@pytest.mark.django_db
+def test_comment_views_load_each_object_once(
+    author_client, comment_item, django_assert_num_queries
+):
+    client, _ = author_client
+    news_url = reverse("news:detail", args=(comment_item.news_id,))
+    # Сессия, пользователь, новость, вставка и счётчик комментариев.
+    with django_assert_num_queries(5):
+        client.post(news_url, {"text": "Ещё комментарий"})
+    # Сессия, пользователь, комментарий вместе с новостью.
+    for name in ("news:edit", "news:delete"):
+        url = reverse(name, args=(comment_item.id,))
+        with django_assert_num_queries(3):
+            response = client.get(url)
+        assert comment_item.news.title in response.content.decode()
+    # Плюс обновление комментария.
+    with django_assert_num_queries(4):
+        client.post(
+            reverse("news:edit", args=(comment_item.id,)), {"text": "Новый"}
+        )
+
+
+@pytest.mark.django_db
+def test_page_query_counts(client, author_client, comment_item, query_counts):
+    author, _ = author_client
+    news_url = reverse("news:detail", args=(comment_item.news_id,))
+    for url in (
+        reverse("news:home"),
+        news_url,
+        reverse("news:archive"),
+        reverse("news:search") + "?q=Новость",
+    ):
+        query_counts(client, url, label="anonymous")
+    query_counts(author, news_url, label="author")
+    query_counts(author, reverse("news:edit", args=(comment_item.id,)))
+    query_counts(
+        author, reverse("news:post_comment", args=(comment_item.news_id,)),
+        "post", {"text": "Новый комментарий"},
+    )
+
+
+@pytest.mark.django_db
+def test_query_budget_middleware(client, news_item, settings, caplog):
+    url = reverse("news:detail", args=(news_item.id,))
+    settings.QUERY_BUDGETS = {"news:detail": 0}
+    settings.QUERY_BUDGET_RAISE = False
+    assert client.get(url).status_code == 200
+    assert "при бюджете 0" in caplog.text
+
+    settings.QUERY_BUDGETS = {}
+    settings.QUERY_REPEAT_LIMIT = 1
+    settings.QUERY_BUDGET_RAISE = True
+    with pytest.raises(QueryBudgetExceeded):
+        client.get(url)
+
+
+def test_query_shape_folds_value_lists():
+    assert query_shape(
+        'SELECT * FROM t WHERE id IN (%s, %s,\n %s)'
+    ) == query_shape("SELECT * FROM t WHERE id IN (%s)")
+
+
+def test_query_snapshots_fail_on_missing_key(tmp_path):
+    from news.pytest_plugin import QuerySnapshots
+    from news.querybudget import QueryLog
+    path = tmp_path / "query_counts.json"
+    with pytest.raises(pytest.fail.Exception, match="нет снимка"):
+        QuerySnapshots(path, update=False).check("GET news:new", QueryLog())
+
+    snapshots = QuerySnapshots(path, update=True)
+    snapshots.check("GET news:new", QueryLog())
+    snapshots.save()
+    QuerySnapshots(path, update=False).check("GET news:new", QueryLog())
@@ -1,8 +1,17 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from io import StringIO
+
 import pytest
+from django.core.management import call_command
 from pytest_django.asserts import assertRedirects, assertFormError
 from django.urls import reverse
 from news.models import Comment, News
 from news.forms import WARNING
+from news.profanity import BadWordsMatcher
 
 
 @pytest.fixture
@@ -99,3 +108,285 @@ def test_other_user_cant_delete_comment(not_author_client):
     response = client.post(url)
     assert response.status_code == 404
     assert Comment.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_comment_count_follows_create_and_delete(author_client):
+    client, user = author_client
+    news = News.objects.create(title="Тестовая новость", text="Содержимое")
+    comments = [
+        Comment.objects.create(text=f"Комментарий {i}", author=user, news=news)
+        for i in range(3)
+    ]
+    news.refresh_from_db()
+    assert news.comment_count == 3
+
+    client.post(reverse("news:delete", args=(comments[0].id,)))
+    news.refresh_from_db()
+    assert news.comment_count == 2
+
+    user.delete()
+    news.refresh_from_db()
+    assert news.comment_count == 0
+
+
+@pytest.mark.django_db
+def test_recount_comments_repairs_counters(author_client):
+    _, user = author_client
+    news = News.objects.create(title="Тестовая новость", text="Содержимое")
+    Comment.objects.bulk_create(
+        Comment(text=f"Комментарий {i}", author=user, news=news)
+        for i in range(4)
+    )
+    news.refresh_from_db()
+    assert news.comment_count == 0
+
+    call_command("recount_comments", stdout=StringIO())
+    news.refresh_from_db()
+    assert news.comment_count == 4
+
+
+def test_bad_words_matcher_reloads_changed_file(tmp_path):
+    words_file = tmp_path / "bad_words.txt"
+    words_file.write_text("# словарь\nредиска\n", encoding="utf-8")
+    matcher = BadWordsMatcher(words_file)
+
+    assert matcher.search("Ты РЕДИСКА!") == "редиска"
+    assert matcher.search("Ты негодяй!") is None
+
+    words_file.write_text("негодяй\n", encoding="utf-8")
+    os.utime(words_file, ns=(0, 10 ** 9))
+    assert matcher.search("Ты негодяй!") == "негодяй"
+    assert matcher.search("Ты редиска!") is None
+
+
+@pytest.mark.django_db
+def test_comment_with_word_from_dictionary_file(author_client):
+    client, _ = author_client
+    news = News.objects.create(title="Тестовая новость", text="Содержимое")
+    url = reverse("news:detail", args=(news.id,))
+    response = client.post(url, data={"text": "Какой негодяй!"})
+
+    assertFormError(response, "form", "text", WARNING)
+    assert Comment.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_ndjson_dump_and_load_keep_counters(tmp_path, comment_item):
+    from django.contrib.auth.models import Group, Permission
+    created = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    Comment.objects.filter(pk=comment_item.pk).update(created=created)
+    author = comment_item.author
+    author.groups.add(Group.objects.create(name="Редакторы"))
+    permission = Permission.objects.get(codename="change_news")
+    author.user_permissions.add(permission)
+    dump = tmp_path / "news.ndjson"
+    call_command("dump_ndjson", output=str(dump), stderr=StringIO())
+    Comment.objects.all().delete()
+    News.objects.all().delete()
+    author.delete()
+    Group.objects.all().delete()
+
+    call_command("load_ndjson", str(dump), stderr=StringIO())
+
+    news = News.objects.get()
+    assert news.comment_count == 1
+    comment = news.comment_set.get()
+    assert comment.text == comment_item.text
+    assert comment.created == created
+    author = comment.author
+    assert list(author.groups.values_list("name", flat=True)) == [
+        "Редакторы"
+    ]
+    assert list(author.user_permissions.all()) == [permission]
+
+
+def test_sqlite_backend_allows_disabled_busy_timeout(tmp_path):
+    from news.sqlite.base import DatabaseWrapper
+    settings_dict = {
+        "ENGINE": "news.sqlite", "NAME": str(tmp_path / "db.sqlite3"),
+        "OPTIONS": {}, "TIME_ZONE": None, "AUTOCOMMIT": True,
+        "CONN_MAX_AGE": 0, "ATOMIC_REQUESTS": False, "TEST": {},
+    }
+    wrapper = DatabaseWrapper({**settings_dict, "PRAGMAS": {}})
+    assert wrapper.get_connection_params()["timeout"] == 5
+    wrapper = DatabaseWrapper(
+        {**settings_dict, "PRAGMAS": {"busy_timeout": None}}
+    )
+    assert "timeout" not in wrapper.get_connection_params()
+
+
+def test_sqlite_backend_retries_locked_write(tmp_path, django_db_blocker):
+    from news.sqlite.base import DatabaseWrapper
+    path = str(tmp_path / "db.sqlite3")
+    wrapper = DatabaseWrapper({
+        "ENGINE": "news.sqlite", "NAME": path, "OPTIONS": {},
+        "TIME_ZONE": None, "AUTOCOMMIT": True, "CONN_MAX_AGE": 0,
+        "ATOMIC_REQUESTS": False, "TEST": {},
+        "PRAGMAS": {"busy_timeout": 10}, "LOCK_RETRIES": 5,
+    })
+    with django_db_blocker.unblock():
+        with wrapper.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            assert cursor.fetchone()[0] == "wal"
+            cursor.execute("CREATE TABLE item (id INTEGER PRIMARY KEY)")
+        holder = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        holder.execute("BEGIN IMMEDIATE")
+        releaser = threading.Timer(0.2, holder.execute, ("COMMIT",))
+        releaser.start()
+        with wrapper.cursor() as cursor:
+            cursor.execute("INSERT INTO item DEFAULT VALUES")
+            cursor.execute("SELECT COUNT(*) FROM item")
+            assert cursor.fetchone()[0] == 1
+        releaser.join()
+        wrapper.close()
+
+
+@pytest.mark.django_db
+def test_read_views_use_replica_until_user_posts(settings, rf):
+    from django.contrib.auth.models import AnonymousUser
+    from django.db import router
+    from django.http import HttpResponse
+    from news.replicas import PIN_COOKIE, read_from_replica
+
+    settings.DATABASE_REPLICAS = {"replica": "replica.sqlite3"}
+    view = read_from_replica(
+        lambda request: HttpResponse(router.db_for_read(News))
+    )
+    request = rf.get("/")
+    request.user = AnonymousUser()
+    assert view(request).content == b"replica"
+    request.COOKIES[PIN_COOKIE] = "1"
+    assert view(request).content == b"default"
+    assert router.db_for_write(News) == "default"
+
+
+def test_comment_post_pins_primary(author_client, news_item, settings):
+    from news.replicas import PIN_COOKIE
+    client, _ = author_client
+    url = reverse("news:detail", args=(news_item.pk,))
+    response = client.post(url, data={"text": "Свежий комментарий"})
+    cookie = response.cookies[PIN_COOKIE]
+    assert cookie["max-age"] == settings.REPLICA_PIN_SECONDS
+    assert client.get(url).wsgi_request.COOKIES[PIN_COOKIE] == "1"
+
+
+@pytest.mark.django_db
+def test_post_comment_returns_rendered_comment(
+    author_client, news_item, django_assert_num_queries
+):
+    client, user = author_client
+    url = reverse("news:post_comment", args=(news_item.id,))
+    # Сессия, пользователь, вставка комментария и счётчик новости.
+    with django_assert_num_queries(4) as queries:
+        response = client.post(url, data={"text": "Быстрый комментарий"})
+    assert not any(
+        'FROM "news_news"' in query["sql"]
+        for query in queries.captured_queries
+    )
+    assert response.status_code == 201
+    comment = Comment.objects.get()
+    payload = response.json()
+    assert payload["id"] == comment.id
+    assert "Быстрый комментарий" in payload["html"]
+    assert reverse("news:edit", args=(comment.id,)) in payload["html"]
+    news_item.refresh_from_db()
+    assert news_item.comment_count == 1
+
+    response = client.post(url, data={"text": "Ах ты, редиска"})
+    assert response.status_code == 400
+    assert response.json()["errors"]["text"] == [WARNING]
+    assert Comment.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_slow_query_log_records_caller_and_plan(
+    client, news_item, settings, slow_query_log
+):
+    log = slow_query_log
+    settings.SLOW_QUERY_THRESHOLD = 0
+    client.get(reverse("news:detail", args=(news_item.id,)))
+    settings.SLOW_QUERY_THRESHOLD = None
+
+    entries = [json.loads(line) for line in log.read_text().splitlines()]
+    news_query = next(
+        entry for entry in entries if 'FROM "news_news"' in entry["sql"]
+    )
+    assert news_query["rows"] == 1
+    assert news_query["caller"].startswith("news/")
+    assert any("news_news" in step for step in news_query["plan"])
+
+    out = StringIO()
+    call_command("slow_queries", str(log), "--sort", "count", stdout=out)
+    assert 'FROM "news_news"' in out.getvalue()
+    assert f"записей: {len(entries)}" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_fast_queries_skip_caller_lookup(
+    client, news_item, settings, monkeypatch
+):
+    from news.sqlite import base
+    lookups = []
+    monkeypatch.setattr(
+        base, "project_caller", lambda: lookups.append(1)
+    )
+    settings.SLOW_QUERY_THRESHOLD = 60
+    client.get(reverse("news:detail", args=(news_item.id,)))
+    assert lookups == []
+
+
+@pytest.mark.django_db
+def test_index_audit_proposes_missing_indexes(author_client, news_item):
+    from news.indexaudit import IndexAudit
+    _, user = author_client
+    audit = IndexAudit("news")
+    with audit.capture("сценарий"):
+        list(Comment.objects.filter(author=user).order_by("-created")[:10])
+        list(Comment.objects.filter(news=news_item).order_by("created", "id"))
+        list(News.objects.filter(title="Новость"))
+    proposed = sorted(
+        finding.index.fields for finding in audit.problems() if finding.index
+    )
+    assert proposed == [["author", "-created"], ["title", "-date"]]
+    proposed_names = sorted(
+        finding.index.name for finding in audit.problems() if finding.index
+    )
+    migration = audit.migration()
+    assert migration.dependencies[0][0] == "news"
+    assert len(migration.operations) == 2
+
+    from news.management.commands.index_audit import Command
+    out = StringIO()
+    Command(stdout=out).report(audit, {"write": False})
+    assert "migrations.AddIndex(" in out.getvalue()
+    assert (
+        "comment: models.Index(fields=('author', '-created'), "
+        f"name='{proposed_names[0]}'),"
+    ) in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_profiling_middleware_saves_signed_requests(client, settings,
+                                                    tmp_path):
+    from news.profiling import profile_token
+    settings.PROFILE_DIR = tmp_path
+    settings.PROFILE_MAX_FILES = 2
+    url = reverse("news:home")
+    client.get(url, HTTP_X_PROFILE="подделка")
+    client.get(url, {"_profile": "подделка"})
+    assert list(tmp_path.iterdir()) == []
+    token = profile_token()
+    client.get(url, HTTP_X_PROFILE=token)
+    client.get(url, {"_profile": token})
+    client.get(url, HTTP_X_PROFILE=token)
+    profiles = sorted(path.name for path in tmp_path.iterdir())
+    assert len(profiles) == 2
+    assert all(name.startswith("news.home__") for name in profiles)
+    out = StringIO()
+    call_command("profile_report", "--top", "3", stdout=out)
+    report = out.getvalue()
+    assert "news:home: профилей 2" in report
+    assert len(report.splitlines()) == 5
@@ -100,3 +100,78 @@ def test_comment_creation_with_invalid_data(author_client):
     assert response.status_code == 200
     assert "form" in response.context
     assert response.context["form"].errors
+
+
+@pytest.mark.django_db
+def test_anonymous_pages_served_from_cache(
+    client, news_item, django_assert_num_queries
+):
+    urls = (reverse("news:home"), reverse("news:detail", args=(news_item.id,)))
+    for url in urls:
+        client.get(url)
+    # Остаётся только запрос для ETag страницы новости.
+    with django_assert_num_queries(1):
+        for url in urls:
+            assert client.get(url).status_code == HTTPStatus.OK
+
+
+@pytest.mark.django_db
+def test_new_comment_invalidates_cached_pages(client, comment_item):
+    home_url = reverse("news:home")
+    detail_url = reverse("news:detail", args=(comment_item.news_id,))
+    client.get(home_url)
+    client.get(detail_url)
+
+    Comment.objects.create(
+        text="Свежий комментарий",
+        news=comment_item.news,
+        author=comment_item.author,
+    )
+
+    assert "Свежий комментарий" in client.get(detail_url).content.decode()
+    assert "Комментариев: 2" in client.get(home_url).content.decode()
+
+
+@pytest.mark.django_db
+def test_news_pages_return_not_modified(
+    client, comment_item, django_assert_num_queries
+):
+    home_url = reverse("news:home")
+    detail_url = reverse("news:detail", args=(comment_item.news_id,))
+    home_etag = client.get(home_url)["ETag"]
+    detail_etag = client.get(detail_url)["ETag"]
+
+    with django_assert_num_queries(0):
+        response = client.get(home_url, HTTP_IF_NONE_MATCH=home_etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    # Одна строка News: дата и счётчик комментариев.
+    with django_assert_num_queries(1):
+        response = client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    comment_item.text = "Исправленный комментарий"
+    comment_item.save()
+    response = client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.django_db
+def test_news_detail_etag_changes_after_new_login(
+    client, django_user_model, news_item
+):
+    django_user_model.objects.create_user(
+        username="reader", password="password"
+    )
+    credentials = {"username": "reader", "password": "password"}
+    client.post(reverse("users:login"), credentials)
+    detail_url = reverse("news:detail", args=(news_item.id,))
+    etag = client.get(detail_url)["ETag"]
+    assert client.get(
+        detail_url, HTTP_IF_NONE_MATCH=etag
+    ).status_code == HTTPStatus.NOT_MODIFIED
+
+    # Новый вход меняет CSRF-токен: нужна страница с новой формой.
+    client.post(reverse("users:logout"))
+    client.post(reverse("users:login"), credentials)
+    response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
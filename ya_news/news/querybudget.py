@@ -0,0 +1,127 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_LIST = re.compile(r'\((?:(?:%s|\?), ?)*(?:%s|\?)\)')
+VALUES_ROWS = re.compile(r'\(\.\.\.\)(?:, ?\(\.\.\.\))+')
+SPACES = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    """Запрос к странице превысил бюджет SQL-запросов или содержит N+1."""
+
+
+def query_shape(sql):
+    """
+    Форма запроса: SQL без значений.
+
+    Значения и так стоят в SQL заполнителями %s (или ? после бэкенда
+    SQLite); списки заполнителей в IN (...) и строки VALUES (...)
+    сворачиваются, чтобы запросы с разным числом значений считались
+    одинаковыми.
+    """
+    shape = PLACEHOLDER_LIST.sub('(...)', SPACES.sub(' ', sql))
+    return VALUES_ROWS.sub('(...)', shape).strip()
+
+
+@dataclass
+class Query:
+    alias: str
+    sql: str
+    params: object
+    many: bool
+    duration: float
+
+
+class QueryLog:
+    """Обёртка execute_wrapper, записывающая все SQL-запросы."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(Query(
+                context['connection'].alias, sql, params, many,
+                time.perf_counter() - started,
+            ))
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self, limit):
+        """Формы запросов, выполненные limit раз и больше, — похоже на N+1."""
+        shapes = Counter(query_shape(query.sql) for query in self.queries)
+        return {
+            shape: count for shape, count in shapes.most_common()
+            if count >= limit
+        }
+
+    def violations(self, budget, repeat_limit):
+        """Описания нарушений: превышение бюджета и повторы запросов."""
+        problems = []
+        if budget is not None and len(self) > budget:
+            problems.append(f'{len(self)} запросов при бюджете {budget}')
+        for shape, count in self.repeated(repeat_limit).items():
+            problems.append(f'{count} раз: {shape}')
+        return problems
+
+
+@contextmanager
+def record_queries():
+    """Записывает запросы ко всем подключениям из DATABASES в QueryLog."""
+    log = QueryLog()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(log))
+        yield log
+
+
+def view_budget(view_name):
+    """Бюджет запросов представления из QUERY_BUDGETS или общий."""
+    return settings.QUERY_BUDGETS.get(view_name, settings.QUERY_BUDGET)
+
+
+class QueryBudgetMiddleware:
+    """
+    Следит за числом SQL-запросов страницы.
+
+    Все запросы записываются в request.query_log. Если их больше
+    бюджета представления или одна форма запроса повторяется
+    QUERY_REPEAT_LIMIT раз и больше (N+1), нарушение пишется в лог,
+    а при QUERY_BUDGET_RAISE — выбрасывается QueryBudgetExceeded.
+    Должна стоять первой в MIDDLEWARE, чтобы учитывать запросы
+    остальных middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as log:
+            response = self.get_response(request)
+        request.query_log = log
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        problems = log.violations(
+            view_budget(view_name), settings.QUERY_REPEAT_LIMIT
+        )
+        if problems:
+            message = '{} {} ({}): {}'.format(
+                request.method, request.path, view_name, '; '.join(problems)
+            )
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,110 @@
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'pin_primary'
+
+_state = threading.local()
+
+
+def current_replica():
+    """Реплика, из которой сейчас идут чтения, или None."""
+    return getattr(_state, 'alias', None)
+
+
+def is_pinned(request):
+    """Пользователь недавно что-то менял и должен видеть свои изменения."""
+    return PIN_COOKIE in request.COOKIES
+
+
+@contextmanager
+def replica_reads():
+    """
+    Внутри блока все чтения идут в одну случайно выбранную реплику.
+
+    Одна реплика на весь блок — чтобы все запросы страницы видели один
+    и тот же снимок базы. Без настроенных реплик блок ничего не меняет.
+    """
+    previous = getattr(_state, 'alias', None)
+    replicas = list(settings.DATABASE_REPLICAS)
+    _state.alias = random.choice(replicas) if replicas else None
+    try:
+        yield _state.alias
+    finally:
+        _state.alias = previous
+
+
+def read_from_replica(view):
+    """
+    Декоратор представления, которое только читает данные.
+
+    Ответ отрисовывается внутри блока, потому что ленивые выборки
+    выполняются в шаблоне. Сессия и пользователь читаются до блока,
+    с основной базы: только что вошедший пользователь может ещё
+    отсутствовать в реплике. Пользователю с cookie PIN_COOKIE страница
+    целиком отдаётся с основной базы.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or is_pinned(request):
+            return view(request, *args, **kwargs)
+        request.user.is_authenticated
+        with replica_reads():
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            return response
+    return wrapper
+
+
+class PinPrimaryMiddleware:
+    """
+    Обеспечивает чтение своих записей после POST.
+
+    Реплики отстают от основной базы на период обновления, поэтому после
+    успешного изменяющего запроса пользователь получает cookie, и ещё
+    REPLICA_PIN_SECONDS секунд его страницы читаются с основной базы —
+    например, редирект на #comments сразу показывает новый комментарий.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (request.method not in ('GET', 'HEAD', 'OPTIONS')
+                and response.status_code < 400):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class ReplicaRouter:
+    """
+    Чтения внутри replica_reads() — в реплику, всё остальное — в default.
+
+    Реплики — копии основной базы, поэтому связи между объектами из
+    разных подключений разрешены, а миграции применяются только к
+    основной базе.
+    """
+
+    def db_for_read(self, model, **hints):
+        return current_replica()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
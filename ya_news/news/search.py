@@ -0,0 +1,94 @@
+import base64
+import json
+import re
+
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import News
+
+# Границы совпадения в выдаче FTS5: управляющие символы, которых нет
+# в тексте новостей, чтобы сначала экранировать текст, а потом
+# превратить их в <mark>.
+MARK_START = '\x02'
+MARK_END = '\x03'
+WORD = re.compile(r'\w+')
+
+SEARCH_SQL = """
+    SELECT news_news.id, news_news.date,
+           highlight(news_news_fts, 0, %s, %s) AS title_highlight,
+           snippet(news_news_fts, 1, %s, %s, '…', 24) AS text_snippet,
+           bm25(news_news_fts, 10.0, 1.0) AS rank
+    FROM news_news_fts
+    JOIN news_news ON news_news.id = news_news_fts.rowid
+    WHERE news_news_fts MATCH %s {seek}
+    ORDER BY rank, news_news.id
+    LIMIT %s
+"""
+SEEK_SQL = """
+    AND (bm25(news_news_fts, 10.0, 1.0) > %s
+         OR (bm25(news_news_fts, 10.0, 1.0) = %s AND news_news.id > %s))
+"""
+
+
+def build_match(query):
+    """
+    Превращает ввод пользователя в безопасный запрос FTS5.
+
+    Каждое слово берётся в кавычки (операторы FTS5 не срабатывают)
+    и ищется по префиксу, чтобы поиск работал по мере набора.
+    """
+    words = WORD.findall(query.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def highlight(value):
+    return mark_safe(
+        escape(value or '')
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def encode_cursor(news):
+    raw = json.dumps([news.rank, news.pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rank, pk = json.loads(base64.urlsafe_b64decode(padded))
+        return float(rank), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def search_news(query, per_page, after=None):
+    """
+    Полнотекстовый поиск по заголовкам и текстам новостей.
+
+    Результаты отсортированы по релевантности (bm25, совпадение
+    в заголовке весит больше) и листаются по курсору (rank, id).
+    Возвращает список новостей и курсор следующей страницы.
+    """
+    match = build_match(query)
+    if not match:
+        return [], None
+    params = [MARK_START, MARK_END, MARK_START, MARK_END, match]
+    seek = ''
+    position = after and decode_cursor(after)
+    if position:
+        seek = SEEK_SQL
+        params += [position[0], position[0], position[1]]
+    results = list(News.objects.raw(
+        SEARCH_SQL.format(seek=seek), params + [per_page + 1]
+    ))
+    for news in results:
+        news.title_highlight = highlight(news.title_highlight)
+        news.text_snippet = highlight(news.text_snippet)
+    next_cursor = None
+    if len(results) > per_page:
+        results = results[:per_page]
+        next_cursor = encode_cursor(results[-1])
+    return results, next_cursor
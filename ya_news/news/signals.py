@@ -0,0 +1,91 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import invalidate_tags
+from .models import Comment, News, NewsPeriod
+
+
+def change_period_count(news_date, delta):
+    """Атомарно меняет счётчик новостей за месяц news_date."""
+    news_date = News._meta.get_field('date').to_python(news_date)
+    period = {'year': news_date.year, 'month': news_date.month}
+    counters = NewsPeriod.objects.filter(**period)
+    if delta < 0:
+        counters = counters.filter(news_count__gte=-delta)
+    updated = counters.update(news_count=F('news_count') + delta)
+    if not updated and delta > 0:
+        _, created = NewsPeriod.objects.get_or_create(
+            **period, defaults={'news_count': delta}
+        )
+        if not created:
+            counters.update(news_count=F('news_count') + delta)
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    """Увеличиваем счётчик комментариев новости атомарно, в БД."""
+    if created:
+        News.objects.filter(pk=instance.news_id).update(
+            comment_count=F('comment_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    """
+    Уменьшаем счётчик при любом удалении комментария.
+
+    Срабатывает и для CommentDelete, и для админки, и для каскадного
+    удаления вместе с автором.
+    """
+    News.objects.filter(pk=instance.news_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1
+    )
+
+
+@receiver(pre_save, sender=News)
+def remember_news_date(sender, instance, raw, **kwargs):
+    """Запоминаем прежнюю дату новости, чтобы перенести её в архиве."""
+    instance._previous_date = None
+    if instance.pk is not None and not raw:
+        instance._previous_date = News.objects.filter(
+            pk=instance.pk
+        ).values_list('date', flat=True).first()
+
+
+@receiver(post_save, sender=News)
+def update_period_on_save(sender, instance, created, **kwargs):
+    """Учитываем новую новость или перенос новости в другой месяц."""
+    if created:
+        change_period_count(instance.date, 1)
+        return
+    previous = getattr(instance, '_previous_date', None)
+    current = News._meta.get_field('date').to_python(instance.date)
+    if previous is not None and (previous.year, previous.month) != (
+            current.year, current.month):
+        change_period_count(previous, -1)
+        change_period_count(current, 1)
+
+
+@receiver(post_delete, sender=News)
+def update_period_on_delete(sender, instance, **kwargs):
+    change_period_count(instance.date, -1)
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def invalidate_news_pages(sender, instance, **kwargs):
+    """Сбрасываем кэш страниц, на которых видна эта новость."""
+    invalidate_tags('news-list', f'news:{instance.pk}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    """Новый комментарий меняет и страницу новости, и счётчик на главной."""
+    invalidate_tags(
+        'news-list',
+        f'news:{instance.news_id}',
+        f'comments:{instance.news_id}',
+    )
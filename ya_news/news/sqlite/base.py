@@ -0,0 +1,206 @@
+import random
+import time
+
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+from ..slowlog import explain, log_slow_query, project_caller
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 256 * 1024 * 1024,
+}
+DEFAULT_LOCK_RETRIES = 5
+DEFAULT_LOCK_RETRY_DELAY = 0.05
+MAX_LOCK_RETRY_DELAY = 1.0
+
+
+def is_locked_error(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+class RetryingCursorWrapper(base.SQLiteCursorWrapper):
+    """
+    Повторяет оператор, который не смог получить блокировку записи.
+
+    Повторять безопасно только вне транзакции: это либо одиночный
+    оператор в режиме автокоммита, либо сам BEGIN IMMEDIATE, до которого
+    транзакция ещё ничего не сделала. Внутри транзакции ошибка
+    пробрасывается как обычно.
+    """
+
+    retries = DEFAULT_LOCK_RETRIES
+    retry_delay = DEFAULT_LOCK_RETRY_DELAY
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._retry(super().executemany, query, param_list)
+
+    def _retry(self, method, *args):
+        attempt = 0
+        while True:
+            in_transaction = self.connection.in_transaction
+            try:
+                return method(*args)
+            except base.Database.OperationalError as error:
+                if (in_transaction or attempt >= self.retries
+                        or not is_locked_error(error)):
+                    raise
+            delay = min(self.retry_delay * 2 ** attempt, MAX_LOCK_RETRY_DELAY)
+            time.sleep(delay * random.uniform(0.5, 1))
+            attempt += 1
+
+
+class TimedCursorWrapper(RetryingCursorWrapper):
+    """
+    Замеряет операторы и пишет медленные в журнал (модуль slowlog).
+
+    SQLite выполняет SELECT по мере выборки строк, поэтому время
+    оператора складывается из execute и всех fetch до следующего
+    оператора или закрытия курсора; тогда же известно число строк.
+    Место вызова в коде проекта ищется только у оператора, перешедшего
+    порог, — в том execute или fetch, где это случилось, пока стек
+    ещё ведёт к представлению или команде. Обход стека у каждого
+    быстрого оператора стоил бы заметно больше самого замера.
+    """
+
+    alias = None
+    threshold = None
+    _statement = None
+    _caller = None
+    _elapsed = 0.0
+    _rows = 0
+
+    def execute(self, query, params=None):
+        self._start(query, params, many=False)
+        return self._timed(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        self._start(query, None, many=True)
+        return self._timed(super().executemany, query, param_list)
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        self._rows += row is not None
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(
+            super().fetchmany, self.arraysize if size is None else size
+        )
+        self._rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._rows += len(rows)
+        return rows
+
+    def __next__(self):
+        row = self._timed(super().__next__)
+        self._rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def _start(self, query, params, many):
+        self._finish()
+        self._statement = (query, params, many)
+        self._caller = None
+        self._elapsed = 0.0
+        self._rows = 0
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._elapsed += time.perf_counter() - started
+            if (self._caller is None and self._statement is not None
+                    and self._elapsed >= self.threshold):
+                self._caller = project_caller()
+
+    def _finish(self):
+        if self._statement is None:
+            return
+        query, params, many = self._statement
+        self._statement = None
+        if self._elapsed < self.threshold:
+            return
+        if params is None and not many:
+            sql = query
+        else:
+            sql = self.convert_query(query)
+        log_slow_query(
+            self.alias, sql, self._elapsed,
+            self._rows if self.description else self.rowcount,
+            # Для executemany параметров много, план без них не построить.
+            None if many else explain(self.connection, sql, params),
+            self._caller,
+        )
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite для работы под нагрузкой.
+
+    На каждом соединении включает WAL и выставляет PRAGMA из ключа
+    PRAGMAS настроек базы (None отключает PRAGMA по умолчанию),
+    транзакции открывает через BEGIN IMMEDIATE, а упёршиеся
+    в блокировку операторы повторяет с экспоненциальной задержкой
+    (LOCK_RETRIES попыток, начиная с LOCK_RETRY_DELAY секунд).
+    Операторы дольше SLOW_QUERY_THRESHOLD секунд пишутся в журнал
+    медленных запросов.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Модуль sqlite3 выставляет собственный тайм-аут ожидания
+        # блокировки; согласуем его с PRAGMA busy_timeout, если она
+        # не отключена.
+        busy_timeout = self.pragmas['busy_timeout']
+        if busy_timeout is not None:
+            params.setdefault('timeout', busy_timeout / 1000)
+        return params
+
+    @property
+    def pragmas(self):
+        return {**DEFAULT_PRAGMAS, **self.settings_dict.get('PRAGMAS', {})}
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            if value is not None:
+                conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def create_cursor(self, name=None):
+        threshold = settings.SLOW_QUERY_THRESHOLD
+        if threshold is None:
+            cursor = self.connection.cursor(factory=RetryingCursorWrapper)
+        else:
+            cursor = self.connection.cursor(factory=TimedCursorWrapper)
+            cursor.alias = self.alias
+            cursor.threshold = threshold
+        cursor.retries = self.settings_dict.get(
+            'LOCK_RETRIES', DEFAULT_LOCK_RETRIES
+        )
+        cursor.retry_delay = self.settings_dict.get(
+            'LOCK_RETRY_DELAY', DEFAULT_LOCK_RETRY_DELAY
+        )
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        # Обычный BEGIN берёт блокировку записи только на первом
+        # изменении, и в WAL такой «поздний» писатель сразу получает
+        # «database is locked», не дожидаясь busy_timeout. IMMEDIATE
+        # ждёт блокировку в самом начале, где повтор безопасен.
+        self.cursor().execute('BEGIN IMMEDIATE')
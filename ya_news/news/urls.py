@@ -8,6 +8,18 @@ app_name = "news"
 urlpatterns = [
     path("", views.NewsList.as_view(), name="home"),
     path("news/<int:pk>/", views.NewsDetailView.as_view(), name="detail"),
+    path("search/", views.NewsSearch.as_view(), name="search"),
+    path("archive/", views.NewsArchive.as_view(), name="archive"),
+    path(
+        "archive/<int:year>/",
+        views.NewsArchive.as_view(),
+        name="archive_year",
+    ),
+    path(
+        "archive/<int:year>/<int:month>/",
+        views.NewsArchive.as_view(),
+        name="archive_month",
+    ),
     path(
         "delete_comment/<int:pk>/",
         views.CommentDelete.as_view(),
@@ -1,40 +1,270 @@
+import re
+from datetime import date
+
 from django.conf import settings
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db.models import Sum
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.http import urlencode
+from django.utils.decorators import method_decorator
+from django.utils.safestring import mark_safe
 from django.views import generic
-from django.http import HttpResponse
+from django.views.decorators.http import condition, require_POST
 
+from .cache import AnonymousPageCacheMixin, make_etag, versioned_key
 from .forms import CommentForm
-from .models import Comment, News
+from .identity import IdentityMapMixin, identity_map
+from .models import Comment, News, NewsPeriod
+from .pagination import KeysetPage, KeysetPaginator
+from .replicas import read_from_replica
+from .search import search_news
+
+COMMENT_ACTIONS_MARK = re.compile(
+    r'<!--comment-actions:(?P<pk>\d+):(?P<author>\d+)-->'
+)
+COMMENT_ACTIONS = (
+    '<a href="{edit}">Редактировать</a> |\n'
+    '<a href="{delete}">Удалить</a>'
+)
+
+
+def comment_paginator(news):
+    """Пагинатор комментариев новости в хронологическом порядке."""
+    return KeysetPaginator(
+        Comment.objects.filter(news=news).select_related('author'),
+        ordering=('created', 'id'),
+        per_page=settings.COMMENTS_COUNT_ON_DETAIL_PAGE,
+    )
+
+
+def comment_page_url(comment):
+    """Адрес страницы новости, которая заканчивается этим комментарием."""
+    cursor = comment_paginator(comment.news_id).encode_cursor(comment)
+    return '{}?{}#comments'.format(
+        reverse('news:detail', kwargs={'pk': comment.news_id}),
+        urlencode({'upto': cursor}),
+    )
+
+
+def add_comment_actions(html, user):
+    """
+    Подставляет ссылки редактирования в комментарии пользователя.
+
+    В закэшированном блоке на их месте стоят метки с id комментария
+    и id автора; чужие метки просто удаляются.
+    """
+    def replace(match):
+        if user.is_authenticated and int(match['author']) == user.pk:
+            return format_html(
+                COMMENT_ACTIONS,
+                edit=reverse('news:edit', args=(match['pk'],)),
+                delete=reverse('news:delete', args=(match['pk'],)),
+            )
+        return ''
+    return mark_safe(COMMENT_ACTIONS_MARK.sub(replace, html))
+
+
+def news_list_etag(request, *args, **kwargs):
+    """Главная меняется только вместе с тегом news-list, БД не нужна."""
+    return make_etag(request, ('news-list',), request.get_full_path())
+
+
+def news_detail_etag(request, pk):
+    """
+    Валидатор страницы новости без загрузки комментариев.
+
+    Дата и счётчик комментариев берутся из строки News, правки новости
+    и комментариев учитывает версия тега news:<pk>. Новость попадает
+    в IdentityMap запроса, и NewsDetail не загружает её повторно.
+    """
+    try:
+        news = identity_map(request).get(News.objects.all(), pk=pk)
+    except News.DoesNotExist:
+        return None
+    return make_etag(
+        request, (f'news:{pk}',), request.get_full_path(),
+        news.date, news.comment_count,
+    )
 
 
-class NewsList(generic.ListView):
+@method_decorator(read_from_replica, name='dispatch')
+@method_decorator(condition(etag_func=news_list_etag), name='dispatch')
+class NewsList(AnonymousPageCacheMixin, generic.ListView):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
+    page_cache_tags = ('news-list',)
 
     def get_queryset(self):
         """
         Выводим только несколько последних новостей.
 
         Их количество определяется в настройках проекта.
+        Число комментариев хранится в самой новости (News.comment_count).
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return self.model.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE]
 
 
-class NewsDetail(generic.DetailView):
+class NewsArchive(generic.ListView):
+    """
+    Архив новостей: целиком, за год или за месяц.
+
+    Новости выводятся постранично по курсору (-date, -id), число новостей
+    за период берётся из заранее посчитанных NewsPeriod.
+    """
     model = News
-    template_name = 'news/detail.html'
+    template_name = 'news/archive.html'
+
+    def get_period(self):
+        """Границы периода [start, end) или None для всего архива."""
+        year = self.kwargs.get('year')
+        month = self.kwargs.get('month')
+        if year is None:
+            return None
+        try:
+            if month is None:
+                return date(year, 1, 1), date(year + 1, 1, 1)
+            if month == 12:
+                return date(year, month, 1), date(year + 1, 1, 1)
+            return date(year, month, 1), date(year, month + 1, 1)
+        except ValueError:
+            raise Http404('Такого периода нет.')
+
+    def get_queryset(self):
+        queryset = self.model.objects.all()
+        period = self.get_period()
+        if period is not None:
+            queryset = queryset.filter(
+                date__gte=period[0], date__lt=period[1]
+            )
+        self.page = KeysetPaginator(
+            queryset,
+            ordering=('-date', '-id'),
+            per_page=settings.NEWS_COUNT_ON_ARCHIVE_PAGE,
+        ).page(
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        return self.page.object_list
+
+    def get_context_data(self, **kwargs):
+        """Периоды и их счётчики для навигации по архиву."""
+        context = super().get_context_data(**kwargs)
+        year = self.kwargs.get('year')
+        month = self.kwargs.get('month')
+        periods = NewsPeriod.objects.filter(news_count__gt=0)
+        if year is None:
+            periods = list(periods.order_by().values('year').annotate(
+                news_count=Sum('news_count')
+            ).order_by('-year'))
+            period_count = sum(period['news_count'] for period in periods)
+        else:
+            periods = list(periods.filter(year=year))
+            period_count = sum(
+                period.news_count for period in periods
+                if month is None or period.month == month
+            )
+        context.update(
+            periods=periods,
+            period_count=period_count,
+            period_start=date(year, month or 1, 1) if year else None,
+            month=month,
+            page=self.page,
+        )
+        return context
+
+
+class NewsSearch(generic.ListView):
+    """
+    Поиск по новостям через полнотекстовый индекс SQLite FTS5.
+
+    Индекс news_news_fts поддерживается триггерами из миграции.
+    """
+    model = News
+    template_name = 'news/search.html'
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        results, self.next_cursor = search_news(
+            self.query,
+            per_page=settings.NEWS_COUNT_ON_SEARCH_PAGE,
+            after=self.request.GET.get('after'),
+        )
+        return results
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        if self.next_cursor:
+            context['next_query'] = urlencode(
+                {'q': self.query, 'after': self.next_cursor}
+            )
+        return context
+
+
+class CommentPageMixin:
+    """
+    Комментарии к новости выводим постранично, по курсору (created, id).
+
+    Курсор берётся из GET-параметров after, before или upto.
+    Готовый HTML страницы комментариев хранится в кэше, пока у новости
+    не изменятся комментарии; ссылки «Редактировать» и «Удалить»
+    подставляются в него для каждого пользователя отдельно.
+    Если блок взят из кэша, в контексте нет списка comments,
+    а page содержит только курсоры соседних страниц.
+    """
 
-    def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
+    def get_cursors(self):
+        return {
+            name: self.request.GET.get(name)
+            for name in ('after', 'before', 'upto')
+        }
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        cursors = self.get_cursors()
+        key = versioned_key(
+            'comments', (f'comments:{self.object.pk}',),
+            self.object.pk, *cursors.values()
         )
-        return obj
+        block = cache.get(key)
+        if block is None:
+            page = comment_paginator(self.object).page(**cursors)
+            context['comments'] = page.object_list
+            block = {
+                'html': render_to_string(
+                    'includes/comments.html',
+                    {'comments': page.object_list, 'page': page},
+                ),
+                'page': KeysetPage(
+                    [], page.next_cursor, page.previous_cursor
+                ),
+            }
+            cache.set(key, block, settings.FRAGMENT_CACHE_TIMEOUT)
+        context['page'] = block['page']
+        context['comments_html'] = add_comment_actions(
+            block['html'], self.request.user
+        )
+        return context
+
+
+@method_decorator(read_from_replica, name='dispatch')
+@method_decorator(condition(etag_func=news_detail_etag), name='dispatch')
+class NewsDetail(
+        AnonymousPageCacheMixin, CommentPageMixin, IdentityMapMixin,
+        generic.DetailView
+):
+    model = News
+    template_name = 'news/detail.html'
+
+    def get_page_cache_tags(self):
+        return (f'news:{self.kwargs["pk"]}',)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -45,6 +275,8 @@ class NewsDetail(generic.DetailView):
 
 class NewsComment(
         LoginRequiredMixin,
+        CommentPageMixin,
+        IdentityMapMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -61,37 +293,46 @@ class NewsComment(
         comment.news = self.object
         comment.author = self.request.user
         comment.save()
+        self.comment = comment
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return comment_page_url(self.comment)
 
 
 class NewsDetailView(generic.View):
+    """
+    Страница новости и добавление комментария по одному адресу.
+
+    Представления создаются один раз при загрузке модуля, а не заново
+    на каждый запрос.
+    """
+    detail_view = staticmethod(NewsDetail.as_view())
+    comment_view = staticmethod(NewsComment.as_view())
 
     def get(self, request, *args, **kwargs):
-        view = NewsDetail.as_view()
-        return view(request, *args, **kwargs)
+        return self.detail_view(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
-        view = NewsComment.as_view()
-        return view(request, *args, **kwargs)
+        return self.comment_view(request, *args, **kwargs)
 
 
-class CommentBase(LoginRequiredMixin):
+class CommentBase(LoginRequiredMixin, IdentityMapMixin):
     """Базовый класс для работы с комментариями."""
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
-        return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
-        ) + '#comments'
+        return comment_page_url(self.object)
 
     def get_queryset(self):
-        """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        """
+        Пользователь может работать только со своими комментариями.
+
+        Новость нужна шаблонам, поэтому загружается тем же запросом.
+        """
+        return self.model.objects.filter(
+            author=self.request.user
+        ).select_related('news')
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
@@ -105,5 +346,29 @@ class CommentDelete(CommentBase, generic.DeleteView):
     template_name = 'news/delete.html'
 
 
+@login_required
+@require_POST
 def post_comment(request, news_id):
-    return HttpResponse("Comment posted!")
+    """
+    Добавление комментария одним запросом, без редиректа.
+
+    Новость не загружается: комментарий вставляется по news_id,
+    а несуществующую новость отклонит внешний ключ. В ответе JSON
+    с готовым HTML комментария (201) или с ошибками формы (400).
+    """
+    form = CommentForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    comment = form.save(commit=False)
+    comment.news_id = news_id
+    comment.author = request.user
+    try:
+        comment.save()
+    except IntegrityError:
+        raise Http404('Такой новости нет.')
+    html = render_to_string('includes/comment.html', {'comment': comment})
+    return JsonResponse({
+        'id': comment.pk,
+        'html': add_comment_actions(html, request.user),
+        'url': comment_page_url(comment),
+    }, status=201)
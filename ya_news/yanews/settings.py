@@ -21,6 +21,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'news.querybudget.QueryBudgetMiddleware',
+    'news.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -28,6 +30,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'news.replicas.PinPrimaryMiddleware',
 ]
 
 ROOT_URLCONF = 'yanews.urls'
@@ -53,11 +56,92 @@ WSGI_APPLICATION = 'yanews.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'news.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'cache_size': -20000,
+            'mmap_size': 256 * 1024 * 1024,
+        },
+        'LOCK_RETRIES': 5,
+        'LOCK_RETRY_DELAY': 0.05,
+    }
+}
+
+# Копии основной базы только для чтения: имя подключения -> файл.
+# Файлы обновляет команда refresh_replicas, например
+# DATABASE_REPLICAS = {'replica1': BASE_DIR / 'replica1.sqlite3'}.
+DATABASE_REPLICAS = {}
+
+for alias, path in DATABASE_REPLICAS.items():
+    DATABASES[alias] = {
+        'ENGINE': 'news.sqlite',
+        'NAME': f'file:{path}?mode=ro',
+        'OPTIONS': {'uri': True},
+        # После подмены файла реплики нужно новое соединение.
+        'CONN_MAX_AGE': 0,
+        'PRAGMAS': {'journal_mode': None},
+        # В тестах и замерах реплика читает тестовую базу default.
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['news.replicas.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = 30
+
+# Кэш общий для всех процессов сервера: в нём версии тегов, по которым
+# сигналы сбрасывают закэшированные страницы и строятся ETag. С LocMemCache
+# у каждого воркера были бы свои версии, и сброс в одном процессе
+# не доходил бы до остальных до истечения тайм-аута.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'django_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
     }
 }
 
+PAGE_CACHE_TIMEOUT = 60 * 5
+
+# Бюджет SQL-запросов на страницу: общий и для отдельных представлений.
+QUERY_BUDGET = 20
+QUERY_BUDGETS = {
+    'news:home': 4,
+    'news:detail': 8,
+    'news:post_comment': 6,
+    'news:archive': 6,
+    'news:archive_year': 6,
+    'news:archive_month': 6,
+    'news:search': 4,
+}
+# Столько одинаковых по форме запросов за страницу считается N+1.
+QUERY_REPEAT_LIMIT = 5
+# Нарушения бюджета: исключение при отладке и в тестах (фикстура
+# raise_query_budget), иначе запись в лог.
+QUERY_BUDGET_RAISE = DEBUG
+
+# Журнал медленных запросов: порог в секундах (None выключает журнал)
+# и файл NDJSON, который ротируется по размеру.
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_QUERY_LOG = BASE_DIR / 'slow_queries.ndjson'
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+# Профилирование запросов cProfile: по подписанному токену
+# (manage.py profile_report --token) в заголовке или параметре запроса
+# либо случайная доля запросов. В каталоге хранятся последние файлы.
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_HEADER = 'X-Profile'
+PROFILE_QUERY_FLAG = '_profile'
+PROFILE_TOKEN_MAX_AGE = 60 * 60 * 24
+PROFILE_DIR = BASE_DIR / 'profiles'
+PROFILE_MAX_FILES = 200
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -80,3 +164,13 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+
+COMMENTS_COUNT_ON_DETAIL_PAGE = 50
+
+NEWS_COUNT_ON_ARCHIVE_PAGE = 20
+
+BAD_WORDS_FILE = BASE_DIR / 'news' / 'data' / 'bad_words.txt'
+
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+NEWS_COUNT_ON_SEARCH_PAGE = 20
@@ -0,0 +1,30 @@
+from django.core.cache import cache
+
+from .models import Note
+from .shards import shard_for
+
+COUNT_KEY = 'notes-count:{}'
+
+
+def notes_count(author_id):
+    """
+    Число заметок автора из кэша.
+
+    Ключ удаляется сигналами при создании и удалении заметок, так что
+    COUNT(*) по индексу автора выполняется только после изменений.
+    Считается всегда в основном шарде автора, а не в реплике: реплики
+    копируют только default и могут отставать, а закэшированное
+    отставшее число жило бы до следующего изменения.
+    """
+    key = COUNT_KEY.format(author_id)
+    count = cache.get(key)
+    if count is None:
+        count = Note.objects.using(shard_for(author_id)).filter(
+            author_id=author_id
+        ).count()
+        cache.set(key, count, None)
+    return count
+
+
+def forget_notes_count(*author_ids):
+    cache.delete_many([COUNT_KEY.format(pk) for pk in author_ids])
@@ -1,9 +1,8 @@
-from pytils.translit import slugify
-
 from django import forms
 from django.core.exceptions import ValidationError
 
-from .models import Note
+from .models import Note, NoteSlug
+from .translit import slugify
 
 WARNING = ' - такой slug уже существует, придумайте уникальное значение!'
 
@@ -16,14 +15,31 @@ class NoteForm(forms.ModelForm):
         fields = ('title', 'text', 'slug')
 
     def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
+        """
+        Обрабатывает случай, если slug не уникален.
+
+        Вручную заданный slug проверяется по общему реестру NoteSlug:
+        заметки разложены по шардам. Пустой slug подберёт Note.save
+        по заголовку, со свободным номером, если основа занята.
+        """
+        slug = self.cleaned_data.get('slug')
         if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
+            title = self.cleaned_data.get('title') or ''
+            max_length = Note._meta.get_field('slug').max_length
+            if self.instance.slug == slugify(title)[:max_length]:
+                return self.instance.slug
+            return ''
+        if slug != self.instance.slug and NoteSlug.objects.filter(
                 slug=slug
-        ).exclude(id=self.instance.pk).exists():
+        ).exists():
             raise ValidationError(slug + WARNING)
         return slug
+
+    def validate_unique(self):
+        """Уникальность slug уже проверена в clean_slug по реестру."""
+        exclude = self._get_validation_exclusions()
+        exclude.append('slug')
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except ValidationError as error:
+            self._update_errors(error)
@@ -0,0 +1,80 @@
+from django.http import Http404
+
+
+class IdentityMap:
+    """
+    Объекты, загруженные за время одного запроса.
+
+    Результат поиска запоминается под SQL queryset вместе с условиями,
+    и повторный такой же поиск обходится без запроса. Поэтому объект,
+    найденный без фильтра по автору, не подменит поиск с таким фильтром.
+    Объекты хранятся под (модель, pk): один и тот же объект, найденный
+    разными запросами, — всегда один экземпляр.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.lookups = {}
+
+    def add(self, obj):
+        """
+        Запоминает объект и связанные, загруженные с ним select_related.
+
+        Если объект с тем же pk уже есть, возвращается прежний экземпляр.
+        """
+        key = (obj._meta.label, obj.pk)
+        obj = self.objects.setdefault(key, obj)
+        for related in obj._state.fields_cache.values():
+            if related is not None:
+                self.add(related)
+        return obj
+
+    def get(self, queryset, **lookup):
+        """Ищет объект по условиям, не больше одного запроса на поиск."""
+        queryset = queryset.filter(**lookup)
+        key = (queryset.model._meta.label, queryset.db, str(queryset.query))
+        if key not in self.lookups:
+            try:
+                # get(), а не first(): first() сортирует по ordering
+                # модели, и SQLite строит для этого временное B-дерево.
+                self.lookups[key] = self.add(queryset.get())
+            except queryset.model.DoesNotExist:
+                self.lookups[key] = None
+        if self.lookups[key] is None:
+            raise queryset.model.DoesNotExist
+        return self.lookups[key]
+
+
+def identity_map(request):
+    """Возвращает IdentityMap запроса, создавая её при первом обращении."""
+    if not hasattr(request, '_identity_map'):
+        request._identity_map = IdentityMap()
+    return request._identity_map
+
+
+class IdentityMapMixin:
+    """
+    get_object() для CBV через IdentityMap запроса.
+
+    Объект из URL загружается один раз, сколько бы раз за запрос его
+    ни запрашивали: в dispatch, в get_success_url или в функции ETag.
+    """
+
+    def get_object(self, queryset=None):
+        if queryset is None:
+            queryset = self.get_queryset()
+        lookup = {}
+        pk = self.kwargs.get(self.pk_url_kwarg)
+        slug = self.kwargs.get(self.slug_url_kwarg)
+        if pk is not None:
+            lookup['pk'] = pk
+        if slug is not None and (pk is None or self.query_pk_and_slug):
+            lookup[self.get_slug_field()] = slug
+        if not lookup:
+            return super().get_object(queryset)
+        try:
+            return identity_map(self.request).get(queryset, **lookup)
+        except queryset.model.DoesNotExist:
+            raise Http404(
+                f'Не найден объект {queryset.model._meta.verbose_name}'
+            )
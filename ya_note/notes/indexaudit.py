@@ -0,0 +1,242 @@
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from django.apps import apps
+from django.db import connections, migrations, models
+from django.db.migrations.loader import MigrationLoader
+
+from .querybudget import query_shape, record_queries
+
+EXPLAINED = ('SELECT', 'UPDATE', 'DELETE')
+# «SCAN news_news» — полный проход таблицы; у SQLite до 3.36
+# «SCAN TABLE news_news». Проход по индексу целиком выглядит как
+# «SCAN news_news USING INDEX ...».
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+INDEX_SCAN = re.compile(
+    r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)? USING (?:COVERING )?INDEX (\w+)$'
+)
+TEMP_BTREE = re.compile(r'^USE TEMP B-TREE FOR (.+)$')
+COLUMN = r'"(?P<table>\w+)"\."(?P<column>\w+)"'
+EQUALITY = re.compile(COLUMN + r' (?:= |IN \()')
+RANGE = re.compile(COLUMN + r' (?:[<>]=?) ')
+ORDER = re.compile(COLUMN + r' (?P<direction>ASC|DESC)')
+CLAUSE_END = re.compile(r' (?:GROUP BY|ORDER BY|LIMIT|HAVING) ')
+
+
+@dataclass
+class Finding:
+    """Запрос с полным проходом или сортировкой во временном B-дереве."""
+    scenario: str
+    sql: str
+    plan: List[str]
+    problems: List[str]
+    index: Optional[models.Index] = None
+    model: Optional[type] = None
+    scenarios: List[str] = field(default_factory=list)
+
+
+def explain(query):
+    with connections[query.alias].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {query.sql}', query.params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def filtered_tables(sql):
+    """Таблицы с условиями равенства в WHERE."""
+    return {match['table'] for match in EQUALITY.finditer(where_clause(sql))}
+
+
+def plan_problems(plan, sql):
+    """
+    Полные проходы таблиц и временные B-деревья в плане запроса.
+
+    Проход по индексу целиком ради сортировки («SCAN t USING INDEX»)
+    считается проблемой, только если у таблицы есть условия равенства
+    в WHERE: тогда строки отбрасываются по одной, как при полном
+    проходе, хотя индекс мог бы сразу найти нужные.
+    """
+    problems = []
+    tables = []
+    for step in plan:
+        step = step.strip()
+        scan = FULL_SCAN.match(step)
+        if scan:
+            problems.append(f'полный проход {scan[1]}')
+            tables.append(scan[1])
+        scan = INDEX_SCAN.match(step)
+        if scan and scan[1] in filtered_tables(sql):
+            problems.append(f'полный проход {scan[1]} по индексу {scan[2]}')
+            tables.append(scan[1])
+        sort = TEMP_BTREE.match(step)
+        if sort:
+            problems.append(f'временное B-дерево для {sort[1]}')
+    return problems, tables
+
+
+def where_clause(sql):
+    if ' WHERE ' not in sql:
+        return ''
+    where = sql.split(' WHERE ', 1)[1]
+    return CLAUSE_END.split(where, 1)[0]
+
+
+def order_clause(sql):
+    if ' ORDER BY ' not in sql:
+        return ''
+    return sql.rsplit(' ORDER BY ', 1)[1].split(' LIMIT ', 1)[0]
+
+
+def index_columns(sql, table):
+    """
+    Столбцы составного индекса для запроса к таблице.
+
+    Сначала столбцы из условий равенства, затем сортировка запроса
+    (со знаком '-' для DESC) или, если сортировки нет, первое условие
+    диапазона — порядок, в котором SQLite может использовать индекс.
+    """
+    where = where_clause(sql)
+    columns = []
+    for match in EQUALITY.finditer(where):
+        if match['table'] == table and match['column'] not in columns:
+            columns.append(match['column'])
+    ordering = [
+        ('-' if match['direction'] == 'DESC' else '') + match['column']
+        for match in ORDER.finditer(order_clause(sql))
+        if match['table'] == table
+    ]
+    if ordering:
+        columns += [
+            column for column in ordering if column.lstrip('-') not in columns
+        ]
+    else:
+        columns += [
+            match['column'] for match in RANGE.finditer(where)
+            if match['table'] == table and match['column'] not in columns
+        ][:1]
+    return columns
+
+
+def existing_indexes(model):
+    """Поля существующих индексов модели, включая индексы внешних ключей."""
+    indexes = [
+        [name.lstrip('-') for name in index.fields]
+        for index in model._meta.indexes
+    ]
+    indexes += [list(fields) for fields in model._meta.unique_together]
+    indexes += [
+        list(constraint.fields) for constraint in model._meta.constraints
+        if isinstance(constraint, models.UniqueConstraint)
+        and constraint.condition is None
+    ]
+    for model_field in model._meta.concrete_fields:
+        if model_field.db_index or model_field.unique:
+            indexes.append([model_field.name])
+    return indexes
+
+
+def propose_index(sql, table, app_label):
+    """Индекс для таблицы запроса или None, если предложить нечего."""
+    models_by_table = {
+        model._meta.db_table: model for model in apps.get_models()
+    }
+    model = models_by_table.get(table)
+    if model is None or model._meta.app_label != app_label:
+        return None, None
+    names = {
+        model_field.column: model_field.name
+        for model_field in model._meta.concrete_fields
+    }
+    fields = []
+    for column in index_columns(sql, table):
+        name = names.get(column.lstrip('-'))
+        if name is None:
+            return None, None
+        fields.append(('-' if column.startswith('-') else '') + name)
+    if not fields:
+        return None, None
+    plain = [name.lstrip('-') for name in fields]
+    for existing in existing_indexes(model):
+        if existing[:len(plain)] == plain:
+            return None, None
+    index = models.Index(fields=fields)
+    index.set_name_with_model(model)
+    return model, index
+
+
+class IndexAudit:
+    """
+    Собирает планы всех запросов сценариев и ищет в них проблемы.
+
+    Запросы одной формы проверяются один раз; находки помнят,
+    в каких сценариях встретился запрос.
+    """
+
+    def __init__(self, app_label):
+        self.app_label = app_label
+        self.findings = {}
+        self.checked = 0
+
+    @contextmanager
+    def capture(self, scenario):
+        with record_queries() as log:
+            yield
+        for query in log.queries:
+            if query.many or not query.sql.lstrip().upper().startswith(
+                    EXPLAINED):
+                continue
+            shape = query_shape(query.sql)
+            if shape in self.findings:
+                finding = self.findings[shape]
+                if finding and scenario not in finding.scenarios:
+                    finding.scenarios.append(scenario)
+                continue
+            self.checked += 1
+            self.findings[shape] = self.check(scenario, query)
+
+    def check(self, scenario, query):
+        plan = explain(query)
+        problems, tables = plan_problems(plan, query.sql)
+        if not problems:
+            return None
+        finding = Finding(scenario, query.sql, plan, problems,
+                          scenarios=[scenario])
+        # Для сортировки без полного прохода индекс ищем по таблицам
+        # из ORDER BY.
+        tables = tables or [
+            match['table'] for match in ORDER.finditer(order_clause(query.sql))
+        ]
+        for table in tables:
+            model, index = propose_index(query.sql, table, self.app_label)
+            if index is not None:
+                finding.model, finding.index = model, index
+                break
+        return finding
+
+    def problems(self):
+        return [finding for finding in self.findings.values() if finding]
+
+    def migration(self, name='index_audit'):
+        """Миграция с предложенными индексами или None."""
+        proposals = {}
+        for finding in self.problems():
+            if finding.index is not None:
+                proposals.setdefault(finding.index.name, finding)
+        if not proposals:
+            return None
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        leaf = loader.graph.leaf_nodes(self.app_label)[0]
+        number = int(leaf[1].split('_', 1)[0]) + 1
+        migration = migrations.Migration(
+            f'{number:04}_{name}', self.app_label
+        )
+        migration.dependencies = [leaf]
+        migration.operations = [
+            migrations.AddIndex(
+                model_name=finding.model._meta.model_name,
+                index=finding.index,
+            )
+            for finding in proposals.values()
+        ]
+        return migration
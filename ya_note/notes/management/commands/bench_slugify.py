@@ -0,0 +1,68 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from pytils.translit import slugify as pytils_slugify
+
+from notes.translit import slugify
+
+ALPHABET = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+
+
+def random_title(rng):
+    words = (
+        ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(3, 10)))
+        for _ in range(rng.randint(2, 8))
+    )
+    return ' '.join(words).capitalize()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость slugify из pytils и табличного slugify '
+        'проекта: на новых заголовках (пустой кэш) и на повторных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--titles', type=int, default=2000,
+            help='Для оценки тёплого кэша не больше translit.MEMO_SIZE.',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        titles = [random_title(rng) for _ in range(options['titles'])]
+        mismatches = sum(
+            pytils_slugify(title) != slugify(title) for title in titles
+        )
+        slugify.cache_clear()
+        repeat = options['repeat']
+        rows = (
+            ('pytils', lambda: None, pytils_slugify),
+            ('translate', slugify.cache_clear, slugify.__wrapped__),
+            ('lru, cold', slugify.cache_clear, slugify),
+            ('lru, warm', lambda: None, slugify),
+        )
+        self.stdout.write(f'{"":>10} {"µs/title":>10} {"speedup":>8}')
+        baseline = None
+        for name, prepare, func in rows:
+            per_title = self.measure(titles, prepare, func, repeat)
+            baseline = baseline or per_title
+            self.stdout.write(
+                f'{name:>10} {per_title * 1e6:>10.2f} '
+                f'{baseline / per_title:>7.1f}x'
+            )
+        self.stdout.write(f'Расхождений с pytils: {mismatches}')
+
+    def measure(self, titles, prepare, func, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            prepare()
+            started = time.perf_counter()
+            for title in titles:
+                func(title)
+            best = min(best, time.perf_counter() - started)
+        return best / len(titles)
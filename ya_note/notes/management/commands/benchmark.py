@@ -0,0 +1,242 @@
+import json
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+
+from notes import urls
+from notes.models import Note
+from notes.search import rebuild_index
+from notes.shards import bulk_create_notes
+from notes.slugs import assign_slugs
+
+User = get_user_model()
+
+# Кэш замера: сигналы сбрасывают теги, а замер очищает кэш, и рабочий
+# файловый кэш проекта трогать нельзя.
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    },
+}
+
+
+@contextmanager
+def isolated_environment():
+    """
+    Временные тестовые базы всех подключений и кэш в памяти.
+
+    Тестовую базу получает каждое подключение из DATABASES: шарды
+    заметок и реплики (они читают тестовую базу default через
+    TEST MIRROR), иначе синтетические данные попали бы в рабочие
+    файлы. Кэш на это время подменяется TEST_CACHES.
+    """
+    setup_test_environment()
+    try:
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases=set(connections)
+        )
+        try:
+            with override_settings(CACHES=TEST_CACHES):
+                yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+    finally:
+        teardown_test_environment()
+
+
+@dataclass
+class Scenario:
+    """Один замеряемый запрос: имя URL, метод и кто его делает."""
+    name: str
+    method: str
+    client: str
+    build: Callable
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    index = max(0, round(share * len(ordered) + 0.5) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует синтетические данные во временной тестовой базе, '
+        'прогоняет все URL из notes/urls.py через тестовый клиент '
+        'и сохраняет p50/p95/p99, число запросов к БД и пик памяти в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument(
+            '--notes', type=int, default=500,
+            help='Число заметок у каждого пользователя.',
+        )
+        parser.add_argument(
+            '--text-size', type=int, default=2000,
+            help='Длина текста заметки в символах.',
+        )
+        parser.add_argument('--requests', type=int, default=30)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('-o', '--output', default='benchmark.json')
+
+    def handle(self, *args, **options):
+        with isolated_environment():
+            self.rng = random.Random(options['seed'])
+            self.generate(options)
+            results = self.run(options)
+        report = {
+            'project': 'ya_note',
+            'params': {
+                key: options[key] for key in (
+                    'users', 'notes', 'text_size', 'requests', 'cold', 'seed',
+                )
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Результаты сохранены в {options["output"]}')
+
+    def generate(self, options):
+        started = time.perf_counter()
+        User.objects.bulk_create(
+            User(username=f'user{i}') for i in range(options['users'])
+        )
+        self.users = list(User.objects.all())
+        words = ['заметка', 'список', 'покупки', 'идея', 'встреча', 'план']
+        for user in self.users:
+            notes = [
+                Note(
+                    title=f'{self.rng.choice(words)} {i}',
+                    text=' '.join(
+                        self.rng.choices(words, k=options['text_size'] // 8)
+                    ),
+                    author=user,
+                )
+                for i in range(options['notes'])
+            ]
+            assign_slugs(notes)
+            bulk_create_notes(notes)
+        rebuild_index()
+        self.serial = 0
+        self.stderr.write(
+            f'Данные сгенерированы за {time.perf_counter() - started:.1f} с'
+        )
+
+    def own_note(self):
+        self.serial += 1
+        return Note.objects.create(
+            title=f'Замер {self.serial}', text='Текст', author=self.users[0]
+        )
+
+    def new_note_data(self):
+        self.serial += 1
+        return {'title': f'Новая {self.serial}', 'text': 'Текст'}
+
+    def scenarios(self):
+        existing = Note.objects.filter(author=self.users[0]).first().slug
+        return [
+            Scenario('notes:home', 'get', 'anonymous',
+                     lambda: (reverse('notes:home'), None)),
+            Scenario('notes:list', 'get', 'author',
+                     lambda: (reverse('notes:list'), None)),
+            Scenario('notes:detail', 'get', 'author',
+                     lambda: (reverse('notes:detail', args=(existing,)),
+                              None)),
+            Scenario('notes:search', 'get', 'author',
+                     lambda: (reverse('notes:search') + '?q=идея', None)),
+            Scenario('notes:add', 'get', 'author',
+                     lambda: (reverse('notes:add'), None)),
+            Scenario('notes:add', 'post', 'author',
+                     lambda: (reverse('notes:add'), self.new_note_data())),
+            Scenario('notes:edit', 'get', 'author',
+                     lambda: (reverse('notes:edit',
+                                      args=(self.own_note().slug,)), None)),
+            Scenario('notes:edit', 'post', 'author',
+                     lambda: (reverse('notes:edit',
+                                      args=(self.own_note().slug,)),
+                              self.new_note_data())),
+            Scenario('notes:delete', 'get', 'author',
+                     lambda: (reverse('notes:delete',
+                                      args=(self.own_note().slug,)), None)),
+            Scenario('notes:delete', 'post', 'author',
+                     lambda: (reverse('notes:delete',
+                                      args=(self.own_note().slug,)), {})),
+            Scenario('notes:success', 'get', 'author',
+                     lambda: (reverse('notes:success'), None)),
+        ]
+
+    def run(self, options):
+        clients = {'anonymous': Client(), 'author': Client()}
+        clients['author'].force_login(self.users[0])
+        scenarios = self.scenarios()
+        covered = {scenario.name for scenario in scenarios}
+        for pattern in urls.urlpatterns:
+            name = f'{urls.app_name}:{pattern.name}'
+            if name not in covered:
+                self.stderr.write(f'URL {name} не покрыт сценариями')
+        results = {}
+        for scenario in scenarios:
+            key = '{} {} ({})'.format(
+                scenario.method.upper(), scenario.name, scenario.client
+            )
+            results[key] = self.measure(
+                scenario, clients[scenario.client], options
+            )
+            self.stdout.write(
+                '{:<45} p50 {p50_ms:>8.2f} p95 {p95_ms:>8.2f} '
+                'p99 {p99_ms:>8.2f} ms, {queries:>3} запросов, '
+                '{peak_kib:>8.1f} KiB'.format(key, **results[key])
+            )
+        return results
+
+    def measure(self, scenario, client, options):
+        timings = []
+        queries = []
+        status = None
+        cache.clear()
+        for _ in range(options['requests']):
+            url, data = scenario.build()
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = getattr(client, scenario.method)(url, data)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            status = response.status_code
+        url, data = scenario.build()
+        tracemalloc.start()
+        getattr(client, scenario.method)(url, data)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            'status': status,
+            'p50_ms': percentile(timings, 0.50),
+            'p95_ms': percentile(timings, 0.95),
+            'p99_ms': percentile(timings, 0.99),
+            'mean_ms': sum(timings) / len(timings),
+            'queries': max(queries),
+            'peak_kib': peak / 1024,
+        }
@@ -0,0 +1,81 @@
+import sys
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router
+
+from notes.models import Note
+
+DEFAULT_MODELS = ('auth.group', 'auth.user', 'notes.note')
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает модели в NDJSON (по объекту в строке) потоком: '
+        'записи читаются порциями через iterator() и память не растёт '
+        'с размером таблицы. Заметки выгружаются из всех шардов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*', default=DEFAULT_MODELS,
+            help='Модели в виде app_label.model, в порядке выгрузки.',
+        )
+        parser.add_argument(
+            '-o', '--output', default='-',
+            help='Файл для выгрузки; по умолчанию stdout.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            models = [apps.get_model(label) for label in options['models']]
+        except (LookupError, ValueError) as error:
+            raise CommandError(error)
+        output = options['output']
+        stream = (
+            sys.stdout if output == '-'
+            else open(output, 'w', encoding='utf-8')
+        )
+        started = time.perf_counter()
+        total = 0
+        try:
+            for model in models:
+                for alias in self.databases_for(model):
+                    queryset = model._default_manager.using(alias)
+                    counter = _Counter(
+                        queryset.order_by('pk').iterator(
+                            options['chunk_size']
+                        )
+                    )
+                    serializers.serialize('jsonl', counter, stream=stream)
+                    total += counter.count
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        elapsed = time.perf_counter() - started
+        self.stderr.write(
+            f'Выгружено объектов: {total} за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-9):.0f} строк/с)'
+        )
+
+    def databases_for(self, model):
+        if model is Note:
+            return settings.NOTE_SHARDS
+        return [router.db_for_read(model)]
+
+
+class _Counter:
+    """Считает объекты, проходящие через сериализатор."""
+
+    def __init__(self, iterable):
+        self.iterable = iterable
+        self.count = 0
+
+    def __iter__(self):
+        for obj in self.iterable:
+            self.count += 1
+            yield obj
@@ -0,0 +1,104 @@
+import sys
+import time
+
+from django.core import serializers
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes.models import Note
+from notes.search import rebuild_index
+from notes.shards import bulk_create_notes
+from notes.slugs import assign_slugs
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает NDJSON, выгруженный dump_ndjson, потоком: объекты '
+        'читаются построчно и сохраняются пачками через bulk_create '
+        'вместе со связями многие-ко-многим, каждая пачка в своей '
+        'транзакции. Заметкам без slug он назначается сразу для всей '
+        'пачки, заметки раскладываются по шардам авторов. После загрузки '
+        'перестраиваются поисковые индексы шардов, куда попали заметки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл NDJSON; "-" — читать из stdin.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        stream = (
+            sys.stdin if path == '-' else open(path, encoding='utf-8')
+        )
+        self.batch_size = options['batch_size']
+        self.total = 0
+        self.next_report = self.batch_size * 50
+        self.started = time.perf_counter()
+        self.shards = set()
+        batch = []
+        try:
+            objects = serializers.deserialize(
+                'jsonl', stream, ignorenonexistent=True
+            )
+            for deserialized in objects:
+                instance = deserialized.object
+                if batch and type(instance) is not type(batch[0][0]):
+                    self.flush(batch)
+                    batch = []
+                batch.append((instance, deserialized.m2m_data))
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = []
+            if batch:
+                self.flush(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        for shard in sorted(self.shards):
+            rebuild_index(shard)
+        elapsed = time.perf_counter() - self.started
+        self.stderr.write(
+            f'Загружено объектов: {self.total} за {elapsed:.1f} с '
+            f'({self.total / max(elapsed, 1e-9):.0f} строк/с)'
+        )
+
+    def flush(self, batch):
+        """Сохраняет пачку объектов одной модели одним bulk_create."""
+        model = type(batch[0][0])
+        if model is Note:
+            notes = [note for note, _ in batch]
+            assign_slugs(notes)
+            self.shards |= bulk_create_notes(notes)
+        else:
+            with transaction.atomic():
+                model._default_manager.bulk_create(
+                    instance for instance, _ in batch
+                )
+                self.save_m2m(model, batch)
+        self.total += len(batch)
+        if self.total >= self.next_report:
+            self.next_report += self.batch_size * 50
+            elapsed = time.perf_counter() - self.started
+            self.stderr.write(
+                f'{self.total} объектов, '
+                f'{self.total / max(elapsed, 1e-9):.0f} строк/с'
+            )
+
+    def save_m2m(self, model, batch):
+        """Связи многие-ко-многим пачки: по bulk_create на связь."""
+        rows = {}
+        for instance, m2m_data in batch:
+            for name, values in m2m_data.items():
+                rows.setdefault(name, []).extend(
+                    (instance.pk, value) for value in values
+                )
+        for name, pairs in rows.items():
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            source = field.m2m_field_name() + '_id'
+            target = field.m2m_reverse_field_name() + '_id'
+            through._default_manager.bulk_create(
+                through(**{source: pk, target: value}) for pk, value in pairs
+            )
@@ -0,0 +1,91 @@
+import pstats
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.profiling import PROFILE_NAME, profile_token, view_name
+
+# Индексы в кортеже pstats: (вызовы без рекурсии, все вызовы,
+# собственное время, время вместе с вложенными вызовами, вызывающие).
+SORT_KEYS = {
+    'tottime': lambda row: row[2],
+    'cumtime': lambda row: row[3],
+    'calls': lambda row: row[1],
+}
+
+
+def function_name(key):
+    """Функция из ключа pstats: путь от BASE_DIR или от site-packages."""
+    filename, line, name = key
+    if filename == '~':
+        return name
+    path = filename.replace(str(settings.BASE_DIR) + '/', '', 1)
+    path = path.rsplit('site-packages/', 1)[-1]
+    return f'{path}:{line} in {name}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка профилей из PROFILE_DIR: профили одного представления '
+        'объединяются, для каждого печатаются самые затратные функции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files', nargs='*',
+            help='Файлы .prof; по умолчанию все профили из PROFILE_DIR.',
+        )
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='tottime',
+            help='Порядок функций: по собственному, полному времени '
+                 'или числу вызовов.',
+        )
+        parser.add_argument('--view', help='Только это представление.')
+        parser.add_argument(
+            '--token', action='store_true',
+            help='Напечатать токен для заголовка PROFILE_HEADER.',
+        )
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(profile_token())
+            return
+        files = [Path(name) for name in options['files']] or sorted(
+            Path(settings.PROFILE_DIR).glob('*.prof')
+        )
+        by_view = defaultdict(list)
+        for path in files:
+            by_view[view_name(path) or path.name].append(path)
+        if options['view']:
+            by_view = {options['view']: by_view.get(options['view'], [])}
+        by_view = {view: paths for view, paths in by_view.items() if paths}
+        if not by_view:
+            raise CommandError(f'Профилей нет: {settings.PROFILE_DIR}')
+        sort_key = SORT_KEYS[options['sort']]
+        self.stdout.write(
+            f'  {"своё":>9} {"всего":>9} мс {"вызовы":>8}  функция'
+        )
+        for view, paths in sorted(by_view.items()):
+            stats = pstats.Stats(*map(str, paths))
+            timings = [
+                int(match['ms']) for match in map(
+                    PROFILE_NAME.match, (path.name for path in paths)
+                ) if match
+            ]
+            self.stdout.write(
+                f'{view}: профилей {len(paths)}'
+                + (f', в среднем {sum(timings) / len(timings):.0f} мс, '
+                   f'худший {max(timings)} мс' if timings else '')
+            )
+            rows = sorted(
+                stats.stats.items(), key=lambda item: sort_key(item[1]),
+                reverse=True,
+            )
+            for key, (_, calls, own, total, _) in rows[:options['top']]:
+                self.stdout.write(
+                    f'  {own * 1000:>9.1f} {total * 1000:>9.1f} мс '
+                    f'{calls:>8}  {function_name(key)}'
+                )
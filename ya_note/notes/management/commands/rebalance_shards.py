@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from notes.models import Note
+from notes.shards import shard_for, sync_slug_registry
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит заметки авторов, чей шард изменился после правки '
+        'NOTE_SHARDS, и сверяет реестр slug с шардами. Заметки автора '
+        'сначала записываются в новый шард и только потом удаляются '
+        'из старого; уже записанные в новый шард заметки пропускаются, '
+        'поэтому прерванный перенос можно просто повторить.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retired', nargs='*', default=[],
+            help='Подключения выводимых шардов: всё из них переносится.',
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        sources = [*settings.NOTE_SHARDS, *options['retired']]
+        unknown = set(sources) - set(settings.DATABASES)
+        if unknown:
+            raise CommandError(
+                f'Нет подключений: {", ".join(sorted(unknown))}'
+            )
+        moved_notes = moved_authors = 0
+        for source in sources:
+            authors = Note.objects.using(source).order_by().values_list(
+                'author_id', flat=True
+            ).distinct()
+            for author_id in list(authors):
+                target = shard_for(author_id)
+                if target == source:
+                    continue
+                count = Note.objects.using(source).filter(
+                    author_id=author_id
+                ).count()
+                self.stdout.write(
+                    f'Автор {author_id}: {count} заметок {source} -> {target}'
+                )
+                if not options['dry_run']:
+                    self.move(author_id, source, target)
+                moved_notes += count
+                moved_authors += 1
+        self.stdout.write(
+            f'Перенесено заметок: {moved_notes}, авторов: {moved_authors}'
+        )
+        if not options['dry_run']:
+            added, removed = sync_slug_registry()
+            self.stdout.write(
+                f'Реестр slug: добавлено {added}, удалено {removed}'
+            )
+
+    def move(self, author_id, source, target):
+        notes = list(Note.objects.using(source).filter(author_id=author_id))
+        # Заметки, которые прерванный запуск уже успел записать
+        # в новый шард, второй раз не записываются.
+        copied = set(Note.objects.using(target).filter(
+            author_id=author_id
+        ).values_list('slug', flat=True))
+        with transaction.atomic(using=target):
+            for note in notes:
+                if note.slug in copied:
+                    continue
+                Note(
+                    title=note.title,
+                    text=note.text,
+                    slug=note.slug,
+                    author_id=author_id,
+                ).save(using=target)
+        Note.objects.using(source).filter(author_id=author_id).delete()
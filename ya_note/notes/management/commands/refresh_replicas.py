@@ -0,0 +1,49 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет реплики из DATABASE_REPLICAS копией основной базы через '
+        'backup API SQLite. Копия пишется во временный файл и атомарно '
+        'подменяет реплику, так что читатели не видят её наполовину.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Обновлять раз в столько секунд, пока не прервут.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('В DATABASE_REPLICAS нет ни одной реплики.')
+        while True:
+            started = time.perf_counter()
+            for alias, path in settings.DATABASE_REPLICAS.items():
+                self.refresh(path)
+            self.stdout.write(
+                f'Реплики обновлены за {time.perf_counter() - started:.2f} с'
+            )
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+    def refresh(self, path):
+        temporary = f'{path}.tmp'
+        source = sqlite3.connect(settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'])
+        target = sqlite3.connect(temporary)
+        try:
+            source.backup(target)
+            # Реплику открывают только на чтение, а WAL требует права
+            # записи в каталог для файла -shm.
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+            source.close()
+        os.replace(temporary, path)
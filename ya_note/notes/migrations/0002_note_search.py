@@ -0,0 +1,27 @@
+from django.db import migrations
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE notes_note_fts USING fts5(
+        title, text, author_id,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO notes_note_fts(rowid, title, text, author_id)
+    SELECT id, title, text, author_id FROM notes_note
+    """,
+]
+
+DROP_SQL = ['DROP TABLE IF EXISTS notes_note_fts']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SQL, DROP_SQL),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.15 on 2026-10-18 16:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_note_slugs(apps, schema_editor):
+    """Заносим в реестр slug уже существующих заметок."""
+    Note = apps.get_model('notes', 'Note')
+    NoteSlug = apps.get_model('notes', 'NoteSlug')
+    connection = schema_editor.connection
+    # Реестр создаётся только в основной базе, в шардах его нет.
+    if NoteSlug._meta.db_table not in connection.introspection.table_names():
+        return
+    alias = connection.alias
+    NoteSlug.objects.using(alias).bulk_create(
+        (
+            NoteSlug(slug=slug, author_id=author_id)
+            for slug, author_id in Note.objects.using(alias).values_list(
+                'slug', 'author_id'
+            )
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0002_note_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='note',
+            name='author',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='NoteSlug',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(fill_note_slugs, migrations.RunPython.noop),
+    ]
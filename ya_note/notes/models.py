@@ -1,8 +1,6 @@
 from django.conf import settings
 from django.db import models
 
-from pytils.translit import slugify
-
 
 class Note(models.Model):
     title = models.CharField(
@@ -26,13 +24,45 @@ class Note(models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        # Заметки могут лежать в шарде, где нет таблицы пользователей.
+        db_constraint=False,
     )
 
+    class Meta:
+        indexes = (
+            models.Index(fields=('author', 'id'), name='note_author_id_idx'),
+        )
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминаем slug из базы: сигналу не нужно перечитывать его."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_slug = instance.__dict__.get('slug')
+        return instance
+
     def save(self, *args, **kwargs):
         if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
+            # slugs импортирует модели, поэтому импорт здесь.
+            from .slugs import allocate_slug
+            allocate_slug(self)
         super().save(*args, **kwargs)
+
+
+class NoteSlug(models.Model):
+    """
+    Реестр занятых slug всех шардов заметок.
+
+    Хранится в основной базе; уникальный индекс на slug обеспечивает
+    уникальность адресов заметок между шардами.
+    """
+    slug = models.SlugField(max_length=100, unique=True)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+
+    def __str__(self):
+        return self.slug
@@ -0,0 +1,156 @@
+import base64
+import json
+from dataclasses import dataclass
+from typing import List, Optional
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.http import urlencode
+
+
+@dataclass
+class KeysetPage:
+    """Страница выборки с курсорами на соседние страницы."""
+    object_list: List
+    next_cursor: Optional[str]
+    previous_cursor: Optional[str]
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def next_query(self):
+        return urlencode({'after': self.next_cursor})
+
+    @property
+    def previous_query(self):
+        return urlencode({'before': self.previous_cursor})
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Постраничный вывод по ключу (keyset/cursor pagination).
+
+    Вместо OFFSET страница начинается с условия «после последней
+    записи предыдущей страницы», поэтому любая страница стоит столько же,
+    сколько первая, если по ключам есть индекс.
+    Ключи задаются как в order_by: ('created', 'id') или ('-date', '-id');
+    последний ключ должен быть уникальным.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [key.lstrip('-') for key in self.ordering]
+
+    def encode_cursor(self, obj):
+        """Курсор указывает на запись obj."""
+        values = [
+            self._field(name).value_to_string(obj) for name in self.fields
+        ]
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Разбирает курсор; для испорченного курсора возвращает None."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded))
+            if len(values) != len(self.fields):
+                return None
+            return [
+                self._field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    def page(self, after=None, before=None, upto=None):
+        """
+        Возвращает страницу.
+
+        after — записи строго после курсора,
+        before — записи строго до курсора,
+        upto — страница, которая заканчивается записью курсора.
+        Без курсора возвращается первая страница.
+        """
+        for cursor, inclusive in ((upto, True), (before, False)):
+            values = cursor and self.decode_cursor(cursor)
+            if values:
+                return self._backward_page(values, inclusive)
+        values = after and self.decode_cursor(after)
+        return self._forward_page(values or None)
+
+    def _forward_page(self, values):
+        queryset = self.queryset.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward=True))
+        rows = list(queryset[:self.per_page + 1])
+        objects = rows[:self.per_page]
+        next_cursor = (
+            self.encode_cursor(objects[-1])
+            if len(rows) > self.per_page else None
+        )
+        previous_cursor = None
+        if values is not None and objects and self._exists(
+                self._seek(values, forward=False, inclusive=True)):
+            previous_cursor = self.encode_cursor(objects[0])
+        return KeysetPage(objects, next_cursor, previous_cursor)
+
+    def _backward_page(self, values, inclusive):
+        queryset = self.queryset.order_by(*self._reversed()).filter(
+            self._seek(values, forward=False, inclusive=inclusive)
+        )
+        rows = list(queryset[:self.per_page + 1])
+        objects = rows[:self.per_page][::-1]
+        previous_cursor = (
+            self.encode_cursor(objects[0])
+            if len(rows) > self.per_page else None
+        )
+        next_cursor = None
+        if objects and self._exists(
+                self._seek(values, forward=True, inclusive=not inclusive)):
+            next_cursor = self.encode_cursor(objects[-1])
+        return KeysetPage(objects, next_cursor, previous_cursor)
+
+    def _exists(self, condition):
+        return self.queryset.filter(condition).exists()
+
+    def _field(self, name):
+        return self.queryset.model._meta.get_field(name)
+
+    def _reversed(self):
+        return [
+            key[1:] if key.startswith('-') else '-' + key
+            for key in self.ordering
+        ]
+
+    def _seek(self, values, forward, inclusive=False):
+        """
+        Условие «ключ больше (или меньше) курсора» в порядке сортировки.
+
+        Для ключей (a, b) после (x, y): a > x OR (a = x AND b > y).
+        """
+        condition = Q()
+        equal = Q()
+        for key, value in zip(self.ordering, values):
+            name = key.lstrip('-')
+            ascending = not key.startswith('-')
+            lookup = 'gt' if ascending == forward else 'lt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        if inclusive:
+            condition |= equal
+        return condition
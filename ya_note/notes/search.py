@@ -0,0 +1,132 @@
+import base64
+import json
+import re
+
+from django.db import connections
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Note
+from .shards import shard_for
+
+# Границы совпадения в выдаче FTS5: управляющие символы, которых нет
+# в тексте заметок, чтобы сначала экранировать текст, а потом
+# превратить их в <mark>.
+MARK_START = '\x02'
+MARK_END = '\x03'
+WORD = re.compile(r'\w+')
+
+SEARCH_SQL = """
+    SELECT notes_note.id, notes_note.slug,
+           highlight(notes_note_fts, 0, %s, %s) AS title_highlight,
+           snippet(notes_note_fts, 1, %s, %s, '…', 24) AS text_snippet,
+           bm25(notes_note_fts, 10.0, 1.0, 0.0) AS rank
+    FROM notes_note_fts
+    JOIN notes_note ON notes_note.id = notes_note_fts.rowid
+    WHERE notes_note_fts MATCH %s {seek}
+    ORDER BY rank, notes_note.id
+    LIMIT %s
+"""
+SEEK_SQL = """
+    AND (bm25(notes_note_fts, 10.0, 1.0, 0.0) > %s
+         OR (bm25(notes_note_fts, 10.0, 1.0, 0.0) = %s
+             AND notes_note.id > %s))
+"""
+
+
+def index_note(note, using='default'):
+    """Добавляет или обновляет заметку в полнотекстовом индексе."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM notes_note_fts WHERE rowid = %s', [note.pk]
+        )
+        cursor.execute(
+            'INSERT INTO notes_note_fts(rowid, title, text, author_id) '
+            'VALUES (%s, %s, %s, %s)',
+            [note.pk, note.title, note.text, note.author_id],
+        )
+
+
+def unindex_note(note, using='default'):
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM notes_note_fts WHERE rowid = %s', [note.pk]
+        )
+
+
+def rebuild_index(using='default'):
+    """Перестраивает индекс целиком, например после bulk_create."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('DELETE FROM notes_note_fts')
+        cursor.execute(
+            'INSERT INTO notes_note_fts(rowid, title, text, author_id) '
+            'SELECT id, title, text, author_id FROM notes_note'
+        )
+
+
+def build_match(query, author_id):
+    """
+    Запрос FTS5: слова пользователя плюс фильтр по автору.
+
+    Автор хранится в индексе отдельной колонкой, поэтому и фильтр,
+    и поиск слов выполняются внутри полнотекстового индекса.
+    Каждое слово берётся в кавычки, чтобы операторы FTS5
+    из ввода пользователя не срабатывали.
+    """
+    words = WORD.findall(query.lower())
+    if not words:
+        return None
+    terms = ' '.join(f'"{word}"*' for word in words)
+    return f'author_id : "{int(author_id)}" AND {{title text}} : ({terms})'
+
+
+def highlight(value):
+    return mark_safe(
+        escape(value or '')
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def encode_cursor(note):
+    raw = json.dumps([note.rank, note.pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rank, pk = json.loads(base64.urlsafe_b64decode(padded))
+        return float(rank), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def search_notes(author, query, per_page, after=None):
+    """
+    Поиск по заметкам одного автора.
+
+    Возвращает список заметок, отсортированный по релевантности,
+    и курсор следующей страницы.
+    """
+    match = build_match(query, author.pk)
+    if not match:
+        return [], None
+    params = [MARK_START, MARK_END, MARK_START, MARK_END, match]
+    seek = ''
+    position = after and decode_cursor(after)
+    if position:
+        seek = SEEK_SQL
+        params += [position[0], position[0], position[1]]
+    results = list(Note.objects.raw(
+        SEARCH_SQL.format(seek=seek), params + [per_page + 1],
+        using=shard_for(author.pk),
+    ))
+    for note in results:
+        note.title_highlight = highlight(note.title_highlight)
+        note.text_snippet = highlight(note.text_snippet)
+    next_cursor = None
+    if len(results) > per_page:
+        results = results[:per_page]
+        next_cursor = encode_cursor(results[-1])
+    return results, next_cursor
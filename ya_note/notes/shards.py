@@ -0,0 +1,164 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Note, NoteSlug
+
+# Не больше параметров в одном запросе, чем допускает SQLite.
+BATCH_SIZE = 500
+
+_state = threading.local()
+
+
+def shard_for(author_id):
+    """
+    Подключение, в котором лежат заметки автора.
+
+    Шард выбирается по хэшу id автора, а не по остатку от id, чтобы
+    авторы подряд не попадали в один шард. При изменении NOTE_SHARDS
+    заметки переносит команда rebalance_shards.
+    """
+    shards = settings.NOTE_SHARDS
+    if len(shards) == 1:
+        return shards[0]
+    digest = hashlib.md5(str(author_id).encode()).digest()
+    return shards[int.from_bytes(digest[:8], 'big') % len(shards)]
+
+
+def current_author_id():
+    """Id пользователя текущего запроса или None вне запроса."""
+    request = getattr(_state, 'request', None)
+    if request is None or not request.user.is_authenticated:
+        return None
+    return request.user.pk
+
+
+class ShardMiddleware:
+    """Запоминает запрос, чтобы роутер выбрал шард по request.user."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        previous = getattr(_state, 'request', None)
+        _state.request = request
+        try:
+            return self.get_response(request)
+        finally:
+            _state.request = previous
+
+
+class NoteShardRouter:
+    """
+    Заметки — в шард автора, реестр slug и всё остальное — в default.
+
+    Автор берётся из подсказки instance (сама заметка или пользователь),
+    иначе из текущего запроса. Если шард автора — default, роутер
+    не вмешивается, и чтения могут уйти в реплики ReplicaRouter.
+    """
+
+    def _author_id(self, hints):
+        instance = hints.get('instance')
+        if isinstance(instance, Note):
+            return instance.author_id
+        if isinstance(instance, get_user_model()):
+            return instance.pk
+        return current_author_id()
+
+    def _route(self, model, hints):
+        if model is Note:
+            author_id = self._author_id(hints)
+            if author_id is not None:
+                shard = shard_for(author_id)
+                if shard != DEFAULT_DB_ALIAS:
+                    return shard
+            return None
+        instance = hints.get('instance')
+        db = instance._state.db if instance is not None else None
+        if db != DEFAULT_DB_ALIAS and db in settings.NOTE_SHARDS:
+            # Например, note.author у заметки из шарда: пользователи
+            # есть только в основной базе.
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or db not in settings.NOTE_SHARDS:
+            return None
+        return app_label == 'notes' and model_name != 'noteslug'
+
+
+def bulk_create_notes(notes):
+    """
+    Сохраняет заметки в шарды их авторов, в каждом шарде — одной
+    транзакцией.
+
+    Сигналы при bulk_create не срабатывают, поэтому slug должны быть уже
+    назначены и заняты в реестре (assign_slugs), а поисковый индекс
+    затронутых шардов нужно перестроить; кэш числа заметок авторов
+    сбрасывается здесь. Id заметок в разных шардах
+    пересекаются, поэтому при нескольких шардах id назначает шард
+    заново: адрес заметки — её slug.
+    Возвращает множество затронутых шардов.
+    """
+    by_shard = {}
+    for note in notes:
+        if len(settings.NOTE_SHARDS) > 1:
+            note.pk = None
+        by_shard.setdefault(shard_for(note.author_id), []).append(note)
+    for shard, shard_notes in by_shard.items():
+        with transaction.atomic(using=shard):
+            Note.objects.using(shard).bulk_create(
+                shard_notes, batch_size=BATCH_SIZE
+            )
+    # counts импортирует shards, поэтому импорт здесь.
+    from .counts import forget_notes_count
+    forget_notes_count(*{note.author_id for note in notes})
+    return set(by_shard)
+
+
+def sync_slug_registry():
+    """
+    Приводит реестр slug в соответствие с заметками всех шардов.
+
+    Нужен после загрузки в обход сигналов и после сбоев между записью
+    в реестр и в шард. Возвращает число добавленных и удалённых slug.
+    """
+    actual = {}
+    for shard in settings.NOTE_SHARDS:
+        actual.update(
+            Note.objects.using(shard).values_list('slug', 'author_id')
+        )
+    registered = dict(
+        NoteSlug.objects.using(DEFAULT_DB_ALIAS).values_list(
+            'slug', 'author_id'
+        )
+    )
+    stale = [
+        slug for slug, author_id in registered.items()
+        if actual.get(slug) != author_id
+    ]
+    for start in range(0, len(stale), BATCH_SIZE):
+        NoteSlug.objects.using(DEFAULT_DB_ALIAS).filter(
+            slug__in=stale[start:start + BATCH_SIZE]
+        ).delete()
+    missing = [
+        NoteSlug(slug=slug, author_id=author_id)
+        for slug, author_id in actual.items()
+        if registered.get(slug) != author_id
+    ]
+    NoteSlug.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+        missing, batch_size=BATCH_SIZE
+    )
+    return len(missing), len(stale)
@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from .cache import invalidate_tags
+from .counts import forget_notes_count
+from .models import Note, NoteSlug
+from .search import index_note, unindex_note
+from .shards import shard_for
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+def bump_notes_version(sender, instance, **kwargs):
+    """Любое изменение заметки меняет версию заметок её автора."""
+    invalidate_tags(f'notes:{instance.author_id}')
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+def reset_notes_count(sender, instance, created=True, **kwargs):
+    """Правка заметки число заметок не меняет, кэш сбрасывать не нужно."""
+    if created:
+        forget_notes_count(instance.author_id)
+
+
+@receiver(post_save, sender=Note)
+def update_search_index(sender, instance, using, raw, **kwargs):
+    if not raw:
+        index_note(instance, using)
+
+
+@receiver(post_delete, sender=Note)
+def remove_from_search_index(sender, instance, using, **kwargs):
+    unindex_note(instance, using)
+
+
+@receiver(pre_save, sender=Note)
+def reserve_slug(sender, instance, using, raw, **kwargs):
+    """
+    Занимаем slug в общем реестре до записи заметки в её шард.
+
+    Slug, уже записанный за этим же автором, считается свободным:
+    его уникальность внутри автора проверит индекс шарда, где лежат
+    все заметки автора.
+    """
+    instance._previous_slug = None
+    if raw:
+        return
+    if getattr(instance, '_loaded_slug', None) is not None:
+        # Заметка загружена из базы в этом же запросе (from_db).
+        instance._previous_slug = instance._loaded_slug
+    elif instance.pk is not None:
+        instance._previous_slug = Note.objects.using(using).filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+    # Slug не изменился или только что занят в реестре assign_slugs.
+    if instance.slug in (
+            instance._previous_slug,
+            getattr(instance, '_reserved_slug', None)):
+        return
+    entry, _ = NoteSlug.objects.get_or_create(
+        slug=instance.slug, defaults={'author_id': instance.author_id}
+    )
+    if entry.author_id != instance.author_id:
+        raise IntegrityError(f'slug {instance.slug} уже занят')
+
+
+@receiver(post_save, sender=Note)
+def release_previous_slug(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_slug', None)
+    if previous and previous != instance.slug:
+        release_slug(previous, instance.author_id)
+    instance._loaded_slug = instance.slug
+
+
+@receiver(post_delete, sender=Note)
+def release_deleted_slug(sender, instance, **kwargs):
+    release_slug(instance.slug, instance.author_id)
+
+
+def release_slug(slug, author_id):
+    """
+    Освобождает slug автора в реестре.
+
+    Если заметка с этим slug есть в текущем шарде автора (её только что
+    перенесли туда rebalance_shards), slug остаётся занятым.
+    """
+    if Note.objects.using(shard_for(author_id)).filter(
+            slug=slug, author_id=author_id).exists():
+        return
+    NoteSlug.objects.filter(slug=slug, author_id=author_id).delete()
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def delete_sharded_notes(sender, instance, **kwargs):
+    """
+    Удаляем заметки пользователя из его шарда.
+
+    Каскадное удаление из основной базы до других шардов не доходит.
+    """
+    shard = shard_for(instance.pk)
+    if shard != DEFAULT_DB_ALIAS:
+        Note.objects.using(shard).filter(author_id=instance.pk).delete()
@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_handler_lock = threading.Lock()
+# Кадры этих файлов — журнал, бэкенд SQLite и учёт запросов страницы,
+# а не код проекта, который выполняет запрос.
+_APP_DIR = Path(__file__).resolve().parent
+_OWN_FILES = tuple(
+    str(_APP_DIR / name) for name in ('slowlog.py', 'querybudget.py', 'sqlite')
+)
+EXPLAINED = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def slow_query_logger():
+    """
+    Логгер медленных запросов с ротацией файла по размеру.
+
+    Обработчик создаётся при первой записи, поэтому файл журнала
+    не появляется, пока медленных запросов не было; при смене
+    SLOW_QUERY_LOG он пересоздаётся.
+    """
+    path = os.path.abspath(settings.SLOW_QUERY_LOG)
+    with _handler_lock:
+        for handler in list(logger.handlers):
+            if not isinstance(handler, RotatingFileHandler):
+                continue
+            if handler.baseFilename == path:
+                return logger
+            logger.removeHandler(handler)
+            handler.close()
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+            encoding='utf-8',
+            delay=True,
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def project_caller():
+    """
+    Первый кадр стека из кода проекта: файл, строка и функция.
+
+    Пропускаются Django, библиотеки и сам журнал, так что для запроса
+    из QuerySet виден вызов в представлении или команде.
+    """
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(base_dir)
+                and 'site-packages' not in filename
+                and not filename.startswith(_OWN_FILES)):
+            return '{}:{} in {}'.format(
+                Path(filename).relative_to(base_dir),
+                frame.f_lineno,
+                frame.f_code.co_name,
+            )
+        frame = frame.f_back
+    return None
+
+
+def explain(connection, sql, params):
+    """План запроса из EXPLAIN QUERY PLAN; для прочих операторов None."""
+    if sql.lstrip().split(None, 1)[0].upper() not in EXPLAINED:
+        return None
+    try:
+        rows = connection.execute(
+            f'EXPLAIN QUERY PLAN {sql}', params or ()
+        ).fetchall()
+    except sqlite3.Error as error:
+        return [f'EXPLAIN не удался: {error}']
+    return [row[-1] for row in rows]
+
+
+def log_slow_query(alias, sql, duration, rows, plan, caller):
+    """Пишет запись о медленном запросе строкой NDJSON."""
+    slow_query_logger().info(json.dumps({
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'db': alias,
+        'ms': round(duration * 1000, 3),
+        'rows': rows,
+        'sql': sql,
+        'plan': plan,
+        'caller': caller,
+    }, ensure_ascii=False))
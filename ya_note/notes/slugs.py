@@ -0,0 +1,152 @@
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import Note, NoteSlug
+from .translit import slugify
+
+# Сколько раз перевыбирать slug, если параллельный запрос занял его
+# между выборкой занятых slug и записью в реестр.
+RESERVE_ATTEMPTS = 5
+# Основ slug в одном запросе: по два параметра на основу, а SQLite
+# допускает не больше 999 параметров.
+BASES_PER_QUERY = 400
+# Самый длинный суффикс, под который приходится обрезать основу: '-N'
+# с номером до десяти знаков.
+MAX_SUFFIX = 11
+
+
+def slug_max_length():
+    return Note._meta.get_field('slug').max_length
+
+
+def base_slug(note):
+    """Slug по заголовку, без номера."""
+    return slugify(note.title)[:slug_max_length()]
+
+
+def taken_slugs(bases):
+    """
+    Занятые slug, которые могут совпасть с основами или их номерами.
+
+    Для основы 'zametka' запрос находит 'zametka' и 'zametka-N'
+    по диапазону префикса, один запрос на пачку основ. У длинной
+    основы перед номером обрезается хвост, поэтому для неё ищется
+    префикс, общий для всех её номеров.
+    """
+    taken = set()
+    bases = list(dict.fromkeys(bases))
+    for start in range(0, len(bases), BASES_PER_QUERY):
+        condition = reduce(or_, (
+            _prefix_condition(base)
+            for base in bases[start:start + BASES_PER_QUERY]
+        ))
+        taken.update(NoteSlug.objects.filter(condition).values_list(
+            'slug', flat=True
+        ))
+    return taken
+
+
+def unregistered_slugs(notes):
+    """
+    Заданные вручную slug пачки, которые ещё не заняты в реестре.
+
+    Такие slug не перенумеровываются: slug, занятый другим автором
+    или повторённый в пачке, — ошибка IntegrityError. Slug, уже
+    записанный за этим же автором, занимать повторно не нужно.
+    """
+    repeated = [
+        slug for slug, count in Counter(
+            note.slug for note in notes
+        ).items() if count > 1
+    ]
+    if repeated:
+        raise IntegrityError(f'slug {repeated[0]} повторяется в пачке')
+    owners = {}
+    slugs = [note.slug for note in notes]
+    for start in range(0, len(slugs), BASES_PER_QUERY):
+        owners.update(NoteSlug.objects.filter(
+            slug__in=slugs[start:start + BASES_PER_QUERY]
+        ).values_list('slug', 'author_id'))
+    for note in notes:
+        owner = owners.get(note.slug, note.author_id)
+        if owner != note.author_id:
+            raise IntegrityError(f'slug {note.slug} уже занят')
+    return [note for note in notes if note.slug not in owners]
+
+
+def _prefix_condition(base):
+    if len(base) > slug_max_length() - MAX_SUFFIX:
+        return _prefix_range(base[:slug_max_length() - MAX_SUFFIX])
+    return Q(slug=base) | _prefix_range(f'{base}-')
+
+
+def _prefix_range(prefix):
+    """
+    Slug, начинающиеся с prefix, в виде диапазона.
+
+    startswith превращается в LIKE, который SQLite не может искать
+    по уникальному индексу реестра, и каждый запрос проходил бы
+    весь NoteSlug; диапазон от prefix до prefix с увеличенным
+    последним символом ищется по индексу.
+    """
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(slug__gte=prefix, slug__lt=upper)
+
+
+def with_suffix(base, number):
+    """Slug с номером: 'zametka-2'; длинная основа обрезается."""
+    if number == 1:
+        return base
+    suffix = f'-{number}'
+    return base[:slug_max_length() - len(suffix)] + suffix
+
+
+def assign_slugs(notes):
+    """
+    Назначает заметкам пачки уникальные slug и занимает их в реестре.
+
+    Заданные вручную slug остаются как есть и занимаются первыми.
+    Заметка без slug получает основу по заголовку, если она свободна,
+    иначе наименьший свободный номер: 'zametka', 'zametka-2', ...
+    Занятые slug выбираются одним запросом по префиксам основ на всю
+    пачку и занимаются в реестре NoteSlug одной вставкой; если
+    параллельный запрос успел занять какой-то из них, уникальный
+    индекс реестра отклонит вставку, и выбор повторится.
+    """
+    explicit = [note for note in notes if note.slug]
+    auto = [note for note in notes if not note.slug]
+    bases = [base_slug(note) for note in auto]
+    for attempt in range(RESERVE_ATTEMPTS):
+        reserved = unregistered_slugs(explicit)
+        taken = taken_slugs(bases) | {note.slug for note in explicit}
+        next_number = dict.fromkeys(bases, 1)
+        for note, base in zip(auto, bases):
+            number = next_number[base]
+            while with_suffix(base, number) in taken:
+                number += 1
+            note.slug = with_suffix(base, number)
+            next_number[base] = number + 1
+            taken.add(note.slug)
+        try:
+            with transaction.atomic():
+                NoteSlug.objects.bulk_create(
+                    NoteSlug(slug=note.slug, author_id=note.author_id)
+                    for note in (*reserved, *auto)
+                )
+        except IntegrityError:
+            if attempt == RESERVE_ATTEMPTS - 1:
+                raise
+            continue
+        for note in notes:
+            note._reserved_slug = note.slug
+        return notes
+
+
+def allocate_slug(note):
+    """Назначает и занимает slug одной заметки."""
+    assign_slugs([note])
+    return note.slug
@@ -0,0 +1,53 @@
+import pytest
+
+from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.test import Client
+
+from notes.pytest_plugin import (  # noqa: F401
+    pytest_addoption, query_counts, query_snapshots, raise_query_budget,
+)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def cache_location(tmp_path_factory):
+    """Кэш тестов лежит во временном каталоге, а не в кэше проекта."""
+    django_settings.CACHES["default"]["LOCATION"] = (
+        tmp_path_factory.mktemp("django_cache")
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def slow_query_log(settings, tmp_path):
+    """Медленные запросы тестов пишутся во временный файл."""
+    settings.SLOW_QUERY_LOG = tmp_path / "slow_queries.ndjson"
+    return settings.SLOW_QUERY_LOG
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create(username='Автор')
+
+
+@pytest.fixture
+def author_client(author):
+    client = Client()
+    client.force_login(author)
+    client.user = author
+    return client
+
+
+@pytest.fixture
+def not_author_client(django_user_model):
+    user = django_user_model.objects.create(username='Не автор')
+    client = Client()
+    client.force_login(user)
+    client.user = user
+    return client
@@ -5,6 +5,7 @@ from django.test import Client
 from django.urls import reverse
 from notes.models import Note
 from notes.forms import NoteForm
+from notes.querybudget import QueryBudgetExceeded
 
 
 @pytest.mark.django_db
@@ -54,3 +55,91 @@ def test_edit_note_page_contains_form(author_client):
 
     assert "form" in response.context
     assert isinstance(response.context["form"], NoteForm)
+
+
+@pytest.mark.django_db
+def test_search_finds_only_own_notes(author_client, not_author_client):
+    own = Note.objects.create(
+        title="Рецепт пирога", text="Мука и яйца", author=author_client.user
+    )
+    Note.objects.create(
+        title="Чужой пирог", text="Секрет", author=not_author_client.user
+    )
+    url = reverse("notes:search")
+
+    response = author_client.get(url, {"q": "пиро"})
+    results = response.context["object_list"]
+    assert results == [own]
+    assert "<mark>пирога</mark>" in results[0].title_highlight
+
+
+@pytest.mark.django_db
+def test_search_index_follows_note_changes(author_client):
+    note = Note.objects.create(
+        title="Заголовок", text="Старый текст", author=author_client.user
+    )
+    url = reverse("notes:search")
+
+    note.text = "Новый текст"
+    note.save()
+    found = author_client.get(url, {"q": "старый"}).context["object_list"]
+    assert found == []
+    found = author_client.get(url, {"q": "новый"}).context["object_list"]
+    assert found == [note]
+
+    note.delete()
+    found = author_client.get(url, {"q": "новый"}).context["object_list"]
+    assert found == []
+
+
+@pytest.mark.django_db
+def test_notes_list_pages_by_cursor(author_client, settings):
+    settings.NOTES_COUNT_ON_LIST_PAGE = 2
+    notes = [
+        Note.objects.create(title=f"Заметка {i}", text="т" * 1000,
+                            author=author_client.user)
+        for i in range(3)
+    ]
+    url = reverse("notes:list")
+    response = author_client.get(url)
+    first_page = list(response.context["object_list"])
+    assert first_page == notes[:2]
+    assert "text" in first_page[0].get_deferred_fields()
+    assert response.context["notes_count"] == 3
+
+    page = response.context["page"]
+    response = author_client.get(f"{url}?{page.next_query}")
+    assert list(response.context["object_list"]) == notes[2:]
+    assert response.context["page"].has_previous
+
+    notes[0].delete()
+    assert author_client.get(url).context["notes_count"] == 2
+    Note.objects.create(title="Ещё", text="т", author=author_client.user)
+    assert author_client.get(url).context["notes_count"] == 3
+
+
+@pytest.mark.django_db
+def test_page_query_counts(author_client, client, query_counts):
+    note = Note.objects.create(
+        title="Заметка", text="Текст", author=author_client.user
+    )
+    query_counts(client, reverse("notes:home"), label="anonymous")
+    for url in (
+        reverse("notes:list"),
+        reverse("notes:detail", args=(note.slug,)),
+        reverse("notes:edit", args=(note.slug,)),
+        reverse("notes:search") + "?q=текст",
+    ):
+        query_counts(author_client, url)
+    query_counts(
+        author_client, reverse("notes:add"), "post",
+        {"title": "Новая", "text": "Текст"},
+    )
+
+
+@pytest.mark.django_db
+def test_query_budget_middleware(author_client, settings):
+    settings.QUERY_BUDGETS = {"notes:list": 1}
+    settings.QUERY_BUDGET_RAISE = True
+    with pytest.raises(QueryBudgetExceeded):
+        author_client.get(reverse("notes:list"))
@@ -1,9 +1,12 @@
+from io import StringIO
+
 import pytest
 
 from django.urls import reverse
 from django.test import Client
-from notes.models import Note
+from notes.models import Note, NoteSlug
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from pytils.translit import slugify
 
 User = get_user_model()
@@ -137,3 +140,290 @@ class TestNoteCreationAndEditing:
 
         assert response.status_code == 404
         assert Note.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_ndjson_round_trip_assigns_slugs(tmp_path, django_user_model):
+    author = django_user_model.objects.create(username="Автор")
+    Note.objects.create(title="Заметка", text="Текст", author=author)
+    dump = tmp_path / "notes.ndjson"
+    lines = [
+        '{"model": "notes.note", "fields": {"title": "Заметка", '
+        f'"text": "Копия {i}", "slug": "", "author": {author.pk}}}}}'
+        for i in range(3)
+    ]
+    dump.write_text("\n".join(lines), encoding="utf-8")
+
+    call_command("load_ndjson", str(dump), stderr=StringIO())
+
+    slugs = set(Note.objects.values_list("slug", flat=True))
+    assert slugs == {"zametka", "zametka-2", "zametka-3", "zametka-4"}
+
+    out = tmp_path / "out.ndjson"
+    call_command("dump_ndjson", "notes.note", output=str(out),
+                 stderr=StringIO())
+    assert len(out.read_text(encoding="utf-8").splitlines()) == 4
+
+
+def test_shard_router_places_notes_by_author(settings):
+    from notes.shards import NoteShardRouter, shard_for
+    settings.NOTE_SHARDS = ["default", "notes_1", "notes_2"]
+    placement = {shard_for(author_id) for author_id in range(1, 50)}
+    assert placement == set(settings.NOTE_SHARDS)
+    assert shard_for(7) == shard_for(7)
+
+    router = NoteShardRouter()
+    author = User(pk=next(
+        pk for pk in range(1, 50) if shard_for(pk) == "notes_2"
+    ))
+    note = Note(author=author)
+    assert router.db_for_write(Note, instance=note) == "notes_2"
+    assert router.db_for_read(Note, instance=author) == "notes_2"
+    assert router.allow_migrate("notes_1", "notes", "note")
+    assert not router.allow_migrate("notes_1", "notes", "noteslug")
+    assert not router.allow_migrate("notes_1", "auth", "user")
+
+
+@pytest.mark.django_db
+def test_slug_registry_keeps_slugs_unique(author_client, not_author_client):
+    from notes.models import NoteSlug
+    from notes.shards import sync_slug_registry
+    author_client.post(reverse("notes:add"), {"title": "Общая", "text": "т"})
+    response = not_author_client.post(
+        reverse("notes:add"), {"title": "Т", "text": "т", "slug": "obschaya"}
+    )
+    assert response.status_code == 200
+    assert Note.objects.count() == 1
+
+    note = Note.objects.get()
+    author_client.post(
+        reverse("notes:edit", args=(note.slug,)),
+        {"title": "Общая", "text": "т", "slug": "novyi"},
+    )
+    assert list(NoteSlug.objects.values_list("slug", flat=True)) == ["novyi"]
+
+    NoteSlug.objects.all().delete()
+    assert sync_slug_registry() == (1, 0)
+    assert NoteSlug.objects.get().author == author_client.user
+
+
+@pytest.mark.django_db
+def test_slug_allocator_numbers_collisions(author, django_user_model):
+    from django.db import IntegrityError
+    from notes.slugs import assign_slugs
+    other = django_user_model.objects.create(username="Другой")
+    Note.objects.create(title="т", text="т", slug="zametka-7", author=other)
+    # Основа свободна: номер не нужен, даже если занят zametka-7.
+    note = Note.objects.create(title="Заметка", text="т", author=author)
+    assert note.slug == "zametka"
+    # Основа занята: наименьший свободный номер.
+    note = Note.objects.create(title="Заметка", text="т", author=other)
+    assert note.slug == "zametka-2"
+
+    long_title = "б" * 100
+    first = Note.objects.create(title=long_title, text="т", author=author)
+    second = Note.objects.create(title=long_title, text="т", author=author)
+    assert first.slug == "b" * 100
+    assert second.slug == "b" * 98 + "-2"
+
+    # Заданные вручную slug занимаются первыми и не перенумеровываются.
+    batch = [
+        Note(title="Заметка", text="т", author=author),
+        Note(title="т", text="т", slug="zametka-3", author=author),
+        Note(title="Заметка", text="т", author=author),
+        Note(title="т", text="т", slug="zametka-9", author=author),
+    ]
+    assign_slugs(batch)
+    assert [note.slug for note in batch] == [
+        "zametka-4", "zametka-3", "zametka-5", "zametka-9",
+    ]
+    assert NoteSlug.objects.filter(slug__startswith="zametka").count() == 7
+
+    taken = Note(title="т", text="т", slug="zametka-7", author=author)
+    with pytest.raises(IntegrityError):
+        assign_slugs([Note(title="Заметка", text="т", author=author), taken])
+    assert not NoteSlug.objects.filter(slug="zametka-6").exists()
+
+    # Префиксы ищутся по уникальному индексу реестра, а не полным проходом.
+    from notes.slugs import _prefix_condition
+    plan = NoteSlug.objects.filter(
+        _prefix_condition("zametka") | _prefix_condition("b" * 100)
+    ).explain()
+    assert "SEARCH notes_noteslug" in plan
+    assert "SCAN notes_noteslug" not in plan
+
+
+@pytest.mark.django_db
+def test_slug_allocator_retries_after_race(author, monkeypatch):
+    from notes import slugs
+    Note.objects.create(title="Заметка", text="т", author=author)
+    real_taken_slugs = slugs.taken_slugs
+    calls = []
+
+    def stale_taken_slugs(bases):
+        calls.append(bases)
+        if len(calls) == 1:
+            return set()
+        return real_taken_slugs(bases)
+
+    monkeypatch.setattr(slugs, "taken_slugs", stale_taken_slugs)
+    note = Note.objects.create(title="Заметка", text="т", author=author)
+    assert note.slug == "zametka-2"
+    assert len(calls) == 2
+
+
+def test_translit_slugify_matches_pytils():
+    import random
+    from notes.translit import slugify as fast_slugify
+    # Одиночные символы из всех блоков, которые встречаются в заголовках,
+    # и случайные строки из них же со сдвоенными разделителями.
+    chars = [
+        chr(code) for code in (*range(0x500), *range(0x2000, 0x2070))
+    ] + ["№"]
+    for char in chars:
+        for text in (char, f"а{char}b", f"{char} {char}", char.upper()):
+            assert fast_slugify(text) == slugify(text), repr(text)
+    pool = [
+        *"абвгдеёжзийклмнопрстуфхцчшщъыьэюяЁЪЫЬЭЮЯ", *"abcxyzXYZ0129",
+        *" \t\n\xa0-_&;.,!?'\"«»“”‘’–—‒−…№#@/()", "&amp;",
+    ]
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = "".join(rng.choices(pool, k=rng.randint(0, 40)))
+        assert fast_slugify(text) == slugify(text), repr(text)
+
+
+@pytest.mark.django_db
+def test_note_views_load_note_once(author_client, django_assert_num_queries):
+    note = Note.objects.create(
+        title="Заметка", text="т", author=author_client.user
+    )
+    for name in ("notes:detail", "notes:edit", "notes:delete"):
+        # Сессия, пользователь и заметка.
+        with django_assert_num_queries(3):
+            author_client.get(reverse(name, args=(note.slug,)))
+    # Прежний slug берётся из загруженной заметки, а не перечитывается:
+    # плюс обновление заметки и её поискового индекса.
+    with django_assert_num_queries(6):
+        author_client.post(
+            reverse("notes:edit", args=(note.slug,)),
+            {"title": "Заметка", "text": "новый", "slug": note.slug},
+        )
+    note.slug = "drugoi"
+    note.save()
+    note.slug = "tretii"
+    note.save()
+    assert list(NoteSlug.objects.values_list("slug", flat=True)) == [
+        "tretii"
+    ]
+
+
+@pytest.mark.django_db
+def test_index_audit_skips_indexed_notes_list(author):
+    from notes.indexaudit import IndexAudit
+    Note.objects.create(title="Заметка", text="т", author=author)
+    audit = IndexAudit("notes")
+    with audit.capture("сценарий"):
+        list(Note.objects.filter(author=author).order_by("id")[:10])
+        list(Note.objects.filter(title="Заметка").order_by("-id"))
+    proposed = [
+        finding.index.fields for finding in audit.problems() if finding.index
+    ]
+    assert proposed == [["title", "-id"]]
+    assert audit.checked == 2
+
+
+@pytest.mark.django_db
+def test_profiling_middleware_samples_requests(author_client, settings,
+                                               tmp_path):
+    settings.PROFILE_DIR = tmp_path
+    settings.PROFILE_SAMPLE_RATE = 1.0
+    author_client.get(reverse("notes:list"))
+    (profile,) = tmp_path.iterdir()
+    assert profile.name.startswith("notes.list__")
+    out = StringIO()
+    call_command("profile_report", "--view", "notes:list", stdout=out)
+    assert "notes:list: профилей 1" in out.getvalue()
+
+
+@pytest.fixture
+def extra_shard(settings, tmp_path):
+    """Второй шард заметок во временном файле."""
+    from django.db import connections
+    alias = "notes_1"
+    connections.databases[alias] = {
+        **connections.databases["default"],
+        "NAME": str(tmp_path / "notes_1.sqlite3"),
+        "TEST": {"NAME": str(tmp_path / "notes_1.sqlite3")},
+    }
+    settings.NOTE_SHARDS = ["default", alias]
+    call_command("migrate", database=alias, verbosity=0)
+    yield alias
+    connections[alias].close()
+    del connections[alias]
+    del connections.databases[alias]
+
+
+@pytest.mark.django_db
+def test_rebalance_shards_repeats_after_partial_move(
+    django_user_model, settings, extra_shard
+):
+    from notes.shards import shard_for
+    users = [
+        django_user_model.objects.create(username=f"user{i}")
+        for i in range(20)
+    ]
+    author = next(user for user in users if shard_for(user.pk) == extra_shard)
+    settings.NOTE_SHARDS = ["default"]
+    notes = [
+        Note.objects.create(title=f"Заметка {i}", text="т", author=author)
+        for i in range(3)
+    ]
+    settings.NOTE_SHARDS = ["default", extra_shard]
+    # Прошлый запуск успел записать в новый шард одну заметку и упал.
+    Note(
+        title=notes[0].title, text=notes[0].text, slug=notes[0].slug,
+        author=author,
+    ).save(using=extra_shard)
+
+    out = StringIO()
+    call_command("rebalance_shards", stdout=out)
+    assert "Перенесено заметок: 3, авторов: 1" in out.getvalue()
+    assert not Note.objects.using("default").exists()
+    assert sorted(
+        Note.objects.using(extra_shard).values_list("slug", flat=True)
+    ) == sorted(note.slug for note in notes)
+    assert set(NoteSlug.objects.values_list("slug", flat=True)) == {
+        note.slug for note in notes
+    }
+
+    out = StringIO()
+    call_command("rebalance_shards", stdout=out)
+    assert "Перенесено заметок: 0, авторов: 0" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_load_ndjson_rebuilds_index_of_loaded_shards(
+    tmp_path, django_user_model, extra_shard, monkeypatch
+):
+    from notes.management.commands import load_ndjson
+    from notes.shards import shard_for
+    users = [
+        django_user_model.objects.create(username=f"user{i}")
+        for i in range(20)
+    ]
+    author = next(user for user in users if shard_for(user.pk) == "default")
+    rebuilt = []
+    monkeypatch.setattr(load_ndjson, "rebuild_index", rebuilt.append)
+    dump = tmp_path / "notes.ndjson"
+    dump.write_text(
+        '{"model": "notes.note", "fields": {"title": "Заметка", '
+        f'"text": "Текст", "slug": "", "author": {author.pk}}}}}',
+        encoding="utf-8",
+    )
+
+    call_command("load_ndjson", str(dump), stderr=StringIO())
+
+    assert rebuilt == ["default"]
+    assert Note.objects.using("default").get().slug == "zametka"
+    assert not Note.objects.using(extra_shard).exists()
@@ -69,3 +69,34 @@ def test_auth_pages_accessibility_for_anonymous_user(client, name):
     url = reverse(name)
     response = client.get(url)
     assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.django_db
+def test_notes_pages_revalidate_without_note_queries(
+    author_client, django_assert_num_queries
+):
+    note = Note.objects.create(
+        title="Заголовок", text="Текст", author=author_client.user
+    )
+    urls = (reverse("notes:list"), reverse("notes:detail", args=(note.slug,)))
+    for url in urls:
+        etag = author_client.get(url)["ETag"]
+        # Только сессия и пользователь, заметки не загружаются.
+        with django_assert_num_queries(2):
+            response = author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_notes_etag_changes_after_edit(author_client):
+    note = Note.objects.create(
+        title="Заголовок", text="Текст", author=author_client.user
+    )
+    url = reverse("notes:list")
+    etag = author_client.get(url)["ETag"]
+
+    note.title = "Новый заголовок"
+    note.save()
+
+    response = author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
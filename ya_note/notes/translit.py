@@ -0,0 +1,57 @@
+import re
+from functools import lru_cache
+
+# Сколько последних заголовков помнить: один и тот же заголовок
+# переводится в slug и в форме, и при сохранении заметки.
+MEMO_SIZE = 4096
+
+AMPERSAND = re.compile(r'&amp;|&')
+SEPARATORS = re.compile(r'[-\s]+')
+
+CYRILLIC = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e',
+    'ё': 'yo', 'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'j', 'к': 'k',
+    'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sch', 'ъ': '', 'ы': 'yi', 'ь': '',
+    'э': 'e', 'ю': 'yu', 'я': 'ya',
+}
+# Типографские тире pytils переводит в дефис уже после склейки
+# разделителей, поэтому 'а – б' даёт 'a---b'.
+DASHES = '‒–—−'
+
+
+class _DeleteMissing(dict):
+    """Таблица для str.translate, удаляющая все символы не из таблицы."""
+
+    def __missing__(self, code):
+        return None
+
+
+def _build_table():
+    table = _DeleteMissing(
+        {ord(char): latin for char, latin in CYRILLIC.items()}
+    )
+    for char in 'abcdefghijklmnopqrstuvwxyz0123456789-':
+        table[ord(char)] = char
+    for char in DASHES:
+        table[ord(char)] = '-'
+    return table
+
+
+TABLE = _build_table()
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def slugify(text):
+    """
+    Slug из строки, совпадающий с pytils.translit.slugify.
+
+    Шаги те же: нижний регистр, '&' -> ' and ', пробелы и дефисы
+    подряд -> один дефис, затем транслитерация. Но посимвольные замены
+    и фильтр pytils заменены одной таблицей str.translate: кавычки, '№',
+    '…', ъ и ь, которые pytils сначала переводит, а потом удаляет как
+    не-буквы, в таблице сразу удаляются.
+    """
+    text = AMPERSAND.sub(' and ', str(text).lower())
+    return SEPARATORS.sub('-', text).translate(TABLE)
@@ -1,12 +1,38 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
+from django.utils.http import urlencode
 from django.views import generic
+from django.views.decorators.http import condition
 
-from .forms import NoteForm
+from .cache import AnonymousPageCacheMixin, make_etag
+from .counts import notes_count
+from .forms import WARNING, NoteForm
+from .identity import IdentityMapMixin
 from .models import Note
+from .pagination import KeysetPaginator
+from .replicas import read_from_replica
+from .search import search_notes
 
 
-class Home(generic.TemplateView):
+def notes_etag(request, *args, **kwargs):
+    """
+    Значение ETag страниц с заметками по версии заметок автора.
+
+    Версия хранится в кэше и меняется сигналами при сохранении
+    и удалении заметок, поэтому ответ 304 обходится без запросов
+    к заметкам. Анонимам валидатор не выдаём: их ждёт редирект на вход.
+    """
+    if not request.user.is_authenticated:
+        return None
+    return make_etag(
+        request, (f'notes:{request.user.pk}',), request.get_full_path()
+    )
+
+
+class Home(AnonymousPageCacheMixin, generic.TemplateView):
     """Домашняя страница."""
     template_name = 'notes/home.html'
 
@@ -16,7 +42,7 @@ class NoteSuccess(LoginRequiredMixin, generic.TemplateView):
     template_name = 'notes/success.html'
 
 
-class NoteBase(LoginRequiredMixin):
+class NoteBase(LoginRequiredMixin, IdentityMapMixin):
     """Базовый класс для остальных CBV."""
     model = Note
     success_url = reverse_lazy('notes:success')
@@ -25,6 +51,14 @@ class NoteBase(LoginRequiredMixin):
         """Пользователь может работать только со своими заметками."""
         return self.model.objects.filter(author=self.request.user)
 
+    def form_valid(self, form):
+        """Slug могли занять между проверкой формы и сохранением."""
+        try:
+            return super().form_valid(form)
+        except IntegrityError:
+            form.add_error('slug', form.cleaned_data['slug'] + WARNING)
+            return self.form_invalid(form)
+
 
 class NoteCreate(NoteBase, generic.CreateView):
     """Добавление заметки."""
@@ -32,9 +66,7 @@ class NoteCreate(NoteBase, generic.CreateView):
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
@@ -49,11 +81,62 @@ class NoteDelete(NoteBase, generic.DeleteView):
     template_name = 'notes/delete.html'
 
 
+@method_decorator(read_from_replica, name='dispatch')
+@method_decorator(condition(etag_func=notes_etag), name='dispatch')
 class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
-    template_name = 'notes/list.html'
+    """
+    Список заметок пользователя постранично, по курсору id.
 
+    Страница читается по индексу (author_id, id) и только с полями,
+    которые выводит шаблон: тексты заметок не загружаются.
+    """
+    template_name = 'notes/list.html'
 
+    def get_queryset(self):
+        self.page = KeysetPaginator(
+            super().get_queryset().only('id', 'title', 'slug'),
+            ordering=('id',),
+            per_page=settings.NOTES_COUNT_ON_LIST_PAGE,
+        ).page(
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        return self.page.object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(
+            page=self.page, notes_count=notes_count(self.request.user.pk)
+        )
+        return context
+
+
+@method_decorator(read_from_replica, name='dispatch')
+@method_decorator(condition(etag_func=notes_etag), name='dispatch')
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+
+class NotesSearch(NoteBase, generic.ListView):
+    """Полнотекстовый поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        results, self.next_cursor = search_notes(
+            self.request.user,
+            self.query,
+            per_page=settings.NOTES_COUNT_ON_SEARCH_PAGE,
+            after=self.request.GET.get('after'),
+        )
+        return results
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        if self.next_cursor:
+            context['next_query'] = urlencode(
+                {'q': self.query, 'after': self.next_cursor}
+            )
+        return context